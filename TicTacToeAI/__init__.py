@@ -0,0 +1,18 @@
+"""An AI based on reinforcement learning to play Tic Tac Toe on a NxN board, without any graphical interface."""
+
+from .batch import BatchSelfPlay
+from .checkpoint import Checkpointer
+from .boards import (board_key, canonical, cell_lines, key_board, line_masks, neighbourhood_masks, rotate,
+                     string_to_list, stabilizer, symmetries, symmetry_arrays, transpose, unique_positions, zobrist_array,
+                     zobrist_hashes, zobrist_tables)
+from .computer import Computer
+from .features import LineValues
+from .game import Bitboard, Game, Human, LineCounter, RateLimited
+from .parallel import ParallelTrainer
+from .replay import ReplayBuffer, ReplayLearner
+from .server import PolicyClient, PolicyServer, load_computer, load_test
+from .sessions import Session, SessionManager, simulate
+from .solver import Solver
+from .stats import Stats, profile_training
+from .tables import PolicyFile, ValueTable, convert_policy, get_many, publish_policy, set_many, write_policy
+from .training import policy_path, print_progress, train, train_policy
@@ -0,0 +1,149 @@
+import argparse
+import json
+import pstats
+import sys
+
+from .benchmark import run_benchmarks, write_results
+from .server import PolicyServer, load_computer, load_test
+from .solver import Solver
+from .stats import Stats
+from .tables import convert_policy
+from .training import print_progress, train
+
+
+def main(argv=None):
+    """Command line entry point, see `python -m TicTacToeAI --help`."""
+    parser = argparse.ArgumentParser(prog="python -m TicTacToeAI", description="Headless tools for the Tic Tac Toe AI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    train_parser = commands.add_parser("train", help="train a policy by self-play")
+    train_parser.add_argument("--rounds", type=int, default=10000, help="number of games")
+    train_parser.add_argument("--size", type=int, default=3, help="dimension N of the NxN board")
+    train_parser.add_argument("--k", type=int, default=None, help="number of aligned positions which wins, N by default")
+    train_parser.add_argument("--near", type=int, default=None,
+                              help="only play at most this many rows and columns away from a played position")
+    train_parser.add_argument("--alpha", type=float, default=0.2)
+    train_parser.add_argument("--gamma", type=float, default=0.9)
+    train_parser.add_argument("--epsilon", type=float, default=0.3, help="exploration rate of the first player")
+    train_parser.add_argument("--symmetry", choices=("all", "canonical"), default="all")
+    train_parser.add_argument("--keys", choices=("string", "zobrist"), default="string")
+    train_parser.add_argument("--table", choices=("dict", "array", "lines"), default="dict",
+                              help="'lines' approximates the values with fixed-size weights over line windows")
+    train_parser.add_argument("--window", type=int, default=None, help="positions per window of the lines table")
+    train_parser.add_argument("--max-bytes", type=int, default=None, help="memory budget of the array table")
+    train_parser.add_argument("--evict", choices=("lfu", "lru", "near"), default=None,
+                              help="entries the array table evicts to stay within --max-bytes")
+    train_parser.add_argument("--moves", choices=("all", "unique"), default="all",
+                              help="'unique' plays one move per class of moves leading to symmetric boards")
+    train_parser.add_argument("--batch", type=int, default=None, help="play this many games at once (needs zobrist keys)")
+    train_parser.add_argument("--workers", type=int, default=None, help="share the games between this many processes")
+    train_parser.add_argument("--sync-every", type=int, default=1000, help="games between two merges of the workers' policies")
+    train_parser.add_argument("--replay", type=int, default=None,
+                              help="learn the games by batches of this many states (needs zobrist keys)")
+    train_parser.add_argument("--replay-thread", action="store_true", help="learn the batches in a background thread")
+    train_parser.add_argument("--seed", type=int, default=None, help="seed of the training, to repeat it exactly")
+    train_parser.add_argument("--format", choices=("json", "binary"), default="json")
+    train_parser.add_argument("--out", default=None,
+                              help="where to save the first player's policy, policy_p1.json or policy_p1.npz for lines")
+    train_parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    train_parser.add_argument("--stats-every", type=int, default=None,
+                              help="write timers and counters as a json line on stderr every this many games")
+    train_parser.add_argument("--profile", default=None, help="run under cProfile and dump the profile to this file")
+    train_parser.add_argument("--checkpoint", default=None,
+                              help="directory to resume from and save checkpoints to, --rounds then counts all games")
+    train_parser.add_argument("--checkpoint-every", type=int, default=1000, help="games between two checkpoints")
+    
+    convert_parser = commands.add_parser("convert", help="convert a json policy to the binary format")
+    convert_parser.add_argument("json_file")
+    convert_parser.add_argument("binary_file")
+    convert_parser.add_argument("--size", type=int, default=None, help="dimension N, needed for zobrist keys")
+    convert_parser.add_argument("--alpha", type=float, default=0.2)
+    convert_parser.add_argument("--gamma", type=float, default=0.9)
+    convert_parser.add_argument("--symmetry", choices=("all", "canonical"), default="all")
+    convert_parser.add_argument("--keys", choices=("string", "zobrist"), default="string")
+    
+    solve_parser = commands.add_parser("solve", help="solve the empty board with perfect play")
+    solve_parser.add_argument("--size", type=int, default=3, help="dimension N of the NxN board")
+    solve_parser.add_argument("--cache", default=None, help=".npz file to load and save solved positions")
+    
+    bench_parser = commands.add_parser("bench", help="measure training throughput, move latency and policy strength")
+    bench_parser.add_argument("--policy", default=None, help="policy file to evaluate instead of training one")
+    bench_parser.add_argument("--size", type=int, default=3, help="dimension N of the NxN board")
+    bench_parser.add_argument("--rounds", type=int, default=2000, help="number of training games to time")
+    bench_parser.add_argument("--games", type=int, default=200, help="number of evaluation games against each opponent")
+    bench_parser.add_argument("--batch", type=int, default=None, help="time batched self-play with this batch size")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--symmetry", choices=("all", "canonical"), default="all")
+    bench_parser.add_argument("--keys", choices=("string", "zobrist"), default="string")
+    bench_parser.add_argument("--table", choices=("dict", "array", "lines"), default="dict")
+    bench_parser.add_argument("--out", default=None, help="json file to write, stdout by default")
+    
+    serve_parser = commands.add_parser("serve", help="serve the moves of a policy over HTTP")
+    serve_parser.add_argument("policy", help="json, binary or lines (.npz) policy file")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--max-batch", type=int, default=64, help="maximum number of boards evaluated at once")
+    serve_parser.add_argument("--batch-wait", type=float, default=0.001, help="seconds a batch waits for more requests")
+    serve_parser.add_argument("--cache-size", type=int, default=10000, help="number of cached answers, 0 to disable")
+    serve_parser.add_argument("--symmetry", choices=("all", "canonical"), default="all", help="of a json policy")
+    serve_parser.add_argument("--keys", choices=("string", "zobrist"), default="string", help="of a json policy")
+    
+    load_parser = commands.add_parser("load", help="play many concurrent games against a policy server")
+    load_parser.add_argument("--host", default="127.0.0.1")
+    load_parser.add_argument("--port", type=int, default=8000)
+    load_parser.add_argument("--sessions", type=int, default=32, help="number of concurrent sessions")
+    load_parser.add_argument("--games", type=int, default=20, help="number of games per session")
+    load_parser.add_argument("--size", type=int, default=3, help="dimension N of the NxN board")
+    load_parser.add_argument("--seed", type=int, default=0)
+    load_parser.add_argument("--out", default=None, help="json file to write, stdout by default")
+    
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        if args.out is None:
+            args.out = "policy_p1.npz" if args.table == "lines" else "policy_p1.json"
+        elif args.table == "lines" and args.out.endswith(".json"):
+            # load_policy and serve would then read the .npz weights as json
+            train_parser.error("the weights of --table lines are saved as .npz, not in " + args.out)
+        stats = None
+        if args.stats_every:
+            stats = Stats(every=args.stats_every, callback=lambda snapshot: print(json.dumps(snapshot), file=sys.stderr))
+        p1, p2 = train(args.rounds, N=args.size, k=args.k, near=args.near, alpha=args.alpha, gamma=args.gamma,
+                       epsilon=args.epsilon, symmetry=args.symmetry, keys=args.keys, table=args.table, moves=args.moves,
+                       window=args.window, max_bytes=args.max_bytes, evict=args.evict, batch=args.batch,
+                       workers=args.workers, sync_every=args.sync_every, replay=args.replay,
+                       replay_thread=args.replay_thread, stats=stats, profile=args.profile,
+                       checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every, seed=args.seed,
+                       progress=None if args.quiet or stats else print_progress)
+        p1.save_policy(format=args.format, file=args.out, N=args.size)
+        if args.profile:
+            pstats.Stats(args.profile, stream=sys.stderr).sort_stats("cumulative").print_stats(20)
+    elif args.command == "convert":
+        convert_policy(args.json_file, args.binary_file, N=args.size, alpha=args.alpha, gamma=args.gamma,
+                       keys=args.keys, symmetry=args.symmetry)
+    elif args.command == "bench":
+        results = run_benchmarks(policy=args.policy, N=args.size, rounds=args.rounds, games=args.games, batch=args.batch,
+                                 seed=args.seed, symmetry=args.symmetry, keys=args.keys, table=args.table)
+        write_results(results, args.out)
+    elif args.command == "solve":
+        solver = Solver("solver", cache=args.cache)
+        score = solver.solve([2]*(args.size*args.size), 0)
+        print("score of the empty board for the first player:", score)
+        if args.cache:
+            solver.save_cache()
+    elif args.command == "serve":
+        server = PolicyServer(load_computer(args.policy, symmetry=args.symmetry, keys=args.keys), host=args.host,
+                              port=args.port, max_batch=args.max_batch, batch_wait=args.batch_wait,
+                              cache_size=args.cache_size)
+        print("serving on http://%s:%d" % server.address, file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == "load":
+        results = load_test(host=args.host, port=args.port, sessions=args.sessions, games=args.games, N=args.size,
+                            seed=args.seed)
+        write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import numpy as np
+
+from .boards import line_masks, zobrist_tables
+from .game import RateLimited
+from .tables import get_many
+
+
+class BatchSelfPlay:
+
+    def __init__(self, p1, p2, N, batch=1024, seed=None, k=None):
+        """ Constructor. Plays many games between two computers at once, the boards being the rows of a NumPy array.
+        All the games of a batch start together and use the policies as they were at the start of the batch;
+        their trajectories are handed to `Computer.update_policy` once the whole batch is over.
+        The simulation is vectorized but the updates still go game by game, so a whole training runs about two to
+        2.5 times as fast as sequential games with zobrist keys on 3x3, not an order of magnitude faster.
+
+        Parameters
+        ----------
+        p1 : `Computer`
+            First player, it needs Zobrist keys.
+
+        p2 : `Computer`
+            Second player, it needs Zobrist keys.
+
+        N : `int`
+            Dimension of board game NxN
+
+        batch : `int`
+            Number of games played at once.
+
+        seed : `int`
+            Seed of the exploration decisions.
+
+        k : `int`
+            Number of aligned positions which wins, N by default. All the empty positions are always available,
+            a neighbourhood as `Game` restricts them to would cost more to mask than the lookups it saves here.
+        """
+        if p1.keys != "zobrist" or p2.keys != "zobrist":
+            raise ValueError("batched self-play computes keys as Zobrist hashes, use keys='zobrist' for both computers")
+        if "lines" in (p1.table, p2.table):
+            raise ValueError("batched self-play looks keys up in tables, the lines table reads boards")
+        self.p1 = p1
+        self.p2 = p2
+        self.N = N
+        self.k = N if k is None else k
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+        size = N*N
+        # one row per line, one column per position
+        self.lines = np.array([[line >> p & 1 for p in range(size)] for line in line_masks(N, k)], dtype=np.int8)
+        # zobrist[s, position, symbol], the first table hashing the board itself
+        self.zobrist = np.array(zobrist_tables(size), dtype=np.uint64)
+        self.moves = 0  # moves played since creation
+
+
+    def afterstate_keys(self, player, hashes):
+        """Keys of the boards reached by playing each position, as `Computer.afterstate_keys` does.
+
+        Parameters
+        ----------
+        player : `Computer`
+            Player to move.
+
+        hashes : `numpy.ndarray`
+            (B, 8) Zobrist hashes of the boards and their symmetric copies.
+
+        Returns
+        -------
+        keys : `numpy.ndarray`
+            (B, N*N) keys.
+        """
+        symbol = 0 if player is self.p1 else 1
+        if player.symmetry == "canonical":
+            return (hashes[:, :, None] ^ self.zobrist[None, :, :, symbol]).min(axis=1)
+        return hashes[:, :1] ^ self.zobrist[None, 0, :, symbol]
+
+
+    def play_batch(self, games=None):
+        """Plays a batch of games until they are all over.
+
+        Parameters
+        ----------
+        games : `int`
+            Number of games, self.batch by default.
+
+        Returns
+        -------
+        winners : `numpy.ndarray`
+            Symbol of the winner of each game, 2 for a tie.
+
+        trajectories : `tuple`
+            For each player, the list of states it reached in each game, in the format `Computer.add_state` stores them.
+        """
+        games = self.batch if games is None else games
+        size = self.N*self.N
+        boards = np.full((games, size), 2, dtype=np.int8)
+        hashes = np.zeros((games, 8), dtype=np.uint64)
+        winners = np.full(games, 2, dtype=np.int8)
+        active = np.ones(games, dtype=bool)
+        steps = ([], [])
+        for ply in range(size):
+            symbol = ply % 2
+            player = (self.p1, self.p2)[symbol]
+            rows = np.flatnonzero(active)
+            empty = boards[rows] == 2
+            # greedy moves, ties broken as in Computer.choose_action
+            keys = self.afterstate_keys(player, hashes[rows]).ravel()
+            if player.replay is not None and player.replay.thread is not None:
+                with player.replay.lock:
+                    values = get_many(player.states_value, keys)
+            else:
+                values = get_many(player.states_value, keys)
+            values = values.reshape(len(rows), size)
+            values[~empty] = -np.inf
+            if player.tie_break == "last":
+                moves = size - 1 - np.argmax(values[:, ::-1], axis=1)
+            elif player.tie_break == "first":
+                moves = np.argmax(values, axis=1)
+            else:
+                ties = values == values.max(axis=1, keepdims=True)
+                moves = np.argmax(np.where(ties, self.rng.random(values.shape), -1), axis=1)
+            # random moves, uniform among the empty positions
+            explore = self.rng.random(len(rows)) <= player.epsilon
+            if explore.any():
+                scores = self.rng.random((int(explore.sum()), size))
+                scores[~empty[explore]] = -1
+                moves[explore] = np.argmax(scores, axis=1)
+            boards[rows, moves] = symbol
+            self.moves += len(rows)
+            hashes[rows] ^= self.zobrist[:, moves, symbol].T
+            steps[symbol].append((rows, hashes[rows].copy()))
+            # a line is won when the player's count on it reaches k
+            won = ((boards[rows] == symbol).astype(np.int8) @ self.lines.T == self.k).any(axis=1)
+            winners[rows[won]] = symbol
+            active[rows[won]] = False
+
+        trajectories = ([[] for i in range(games)], [[] for i in range(games)])
+        for symbol, player in enumerate((self.p1, self.p2)):
+            for rows, step_hashes in steps[symbol]:
+                if player.symmetry == "canonical":
+                    states = step_hashes.min(axis=1).tolist()
+                else:
+                    states = [tuple(h) for h in step_hashes.tolist()]
+                for row, state in zip(rows.tolist(), states):
+                    trajectories[symbol][row].append(state)
+        return winners, trajectories
+
+
+    def learn(self, winners, trajectories):
+        """Gives rewards for a batch of games, as `Game.give_reward` does, game after game.
+
+        Parameters
+        ----------
+        winners, trajectories :
+            Results of `play_batch`.
+        """
+        rewards = {0: (1, 0), 1: (0, 1), 2: (0.5, 0.5)}
+        for winner, states1, states2 in zip(winners.tolist(), *trajectories):
+            for player, states, reward in zip((self.p1, self.p2), (states1, states2), rewards[winner]):
+                player.states = states
+                player.update_policy(reward)
+                player.reset()
+
+
+    def training(self, rounds=100, progress=None, interval=0.1):
+        """ Handles training of player 1 and player 2 by batches of games.
+
+        Parameters
+        ----------
+        rounds : `int`
+            Number of games in the training.
+
+        progress : `callable`
+            Called as progress(done, rounds) after a batch, at most once every interval seconds and after the last batch.
+
+        interval : `float`
+            Minimum number of seconds between two calls to progress.
+        """
+        if progress is not None:
+            progress = RateLimited(progress, interval)
+        done = 0
+        while done < rounds:
+            games = min(self.batch, rounds - done)
+            self.learn(*self.play_batch(games))
+            done += games
+            if progress is not None:
+                progress(done, rounds)
@@ -0,0 +1,224 @@
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from .batch import BatchSelfPlay
+from .computer import Computer
+from .features import LineValues
+from .game import Game
+from .solver import Solver
+from .tables import POLICY_HEADER, PolicyFile, ValueTable
+
+
+def play(game):
+    """Plays one game without learning, from the current board of the game until the end.
+
+        Parameters
+        ----------
+        game : `Game`
+            Game between the two players.
+        Returns
+        -------
+        winner : `int`
+            Symbol of the winner, None for a tie.
+        """
+    while game.gameStillGoing:
+        player = game.p1 if game.currentPlayer == 0 else game.p2
+        positions = game.available_positions()
+        pick = player.choose_action(positions, game.board, game.currentPlayer, game.hashes)
+        game.update_board(pick)
+        game.check_if_game_over()
+    return game.winner
+
+
+def evaluate(computer, opponent, N=3, games=200, seed=0):
+    """Plays a computer against an opponent, each starting half of the games, without learning.
+
+        Parameters
+        ----------
+        computer : `Computer`
+            Player to evaluate, usually with epsilon=0.
+        opponent : `Computer` or `Solver`
+            Opponent, e.g. Computer(epsilon=1) for random play or Solver for optimal play.
+        N : `int`
+            Dimension of board game NxN
+        games : `int`
+            Number of games.
+        seed : `int`
+            Seed of the generators of the players, which are reseeded with independent streams.
+        Returns
+        -------
+        rates : `dict`
+            Fraction of wins, draws and losses of the computer.
+        """
+    for player, stream in zip((computer, opponent), np.random.SeedSequence(seed).spawn(2)):
+        if hasattr(player, "reseed"):
+            player.reseed(stream)
+    results = {"win": 0, "draw": 0, "loss": 0}
+    zobrist = "zobrist" in (getattr(computer, "keys", None), getattr(opponent, "keys", None))
+    for i in range(games):
+        first = i % 2 == 0
+        game = Game(computer, opponent, N, bitboard=True, incremental=True, zobrist=zobrist) if first else \
+            Game(opponent, computer, N, bitboard=True, incremental=True, zobrist=zobrist)
+        winner = play(game)
+        if winner is None:
+            results["draw"] += 1
+        elif (winner == 0) == first:
+            results["win"] += 1
+        else:
+            results["loss"] += 1
+    return {result: count / games for result, count in results.items()}
+
+
+def benchmark_training(rounds=2000, N=3, batch=None, seed=0, **settings):
+    """Times self-play training from scratch.
+
+        Parameters
+        ----------
+        rounds : `int`
+            Number of games.
+        N : `int`
+            Dimension of board game NxN
+        batch : `int`
+            If given, games are played by `BatchSelfPlay` with this batch size.
+        seed : `int`
+            Seed of the random draws.
+        settings :
+            Settings of both computers, see `Computer`.
+        Returns
+        -------
+        results : `dict`
+            Games and moves per second, and the table of the first player after training.
+        """
+    seeds = np.random.SeedSequence(seed).spawn(2)
+    p1 = Computer("p1", seed=seeds[0], **settings)
+    p2 = Computer("p2", seed=seeds[1], **{key: value for key, value in settings.items() if key != "epsilon"})
+    if batch:
+        game = BatchSelfPlay(p1, p2, N, batch=batch, seed=seed)
+    else:
+        game = Game(p1, p2, N, bitboard=True, incremental=True, zobrist=p1.keys == "zobrist")
+    start = time.perf_counter()
+    game.training(rounds)
+    elapsed = time.perf_counter() - start
+    return {"rounds": rounds, "seconds": elapsed, "games_per_second": rounds / elapsed,
+            "moves_per_second": game.moves / elapsed, "table": table_footprint(p1.states_value)}, p1
+
+
+def benchmark_choose_action(computer, N=3, positions=200, repeats=5, seed=0):
+    """Times `choose_action` on a fixed sample of random positions.
+
+        Parameters
+        ----------
+        computer : `Computer`
+            Player to time.
+        N : `int`
+            Dimension of board game NxN
+        positions : `int`
+            Number of positions in the sample.
+        repeats : `int`
+            Number of calls per position.
+        seed : `int`
+            Seed of the sample and of the random draws.
+        Returns
+        -------
+        latency : `dict`
+            Mean, median and 99th percentile of the time per call, in microseconds.
+        """
+    rng = np.random.default_rng(seed)
+    samples = []
+    while len(samples) < positions:
+        game = Game(None, None, N, bitboard=True, incremental=True, zobrist=True)
+        for i in range(int(rng.integers(0, N*N - 1))):
+            game.update_board(int(rng.choice(game.available_positions())))
+            game.check_if_game_over()
+            if not game.gameStillGoing:
+                break
+        if game.gameStillGoing:
+            samples.append((game.available_positions(), list(game.board), game.currentPlayer, list(game.hashes)))
+    computer.reseed(seed)
+    timings = []
+    for positions_, board, symbol, hashes in samples:
+        for i in range(repeats):
+            start = time.perf_counter()
+            computer.choose_action(positions_, board, symbol, hashes)
+            timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1e6
+    return {"calls": len(timings), "mean_us": float(timings.mean()), "median_us": float(np.median(timings)),
+            "p99_us": float(np.percentile(timings, 99))}
+
+
+def table_footprint(states_value):
+    """Number of entries and approximate memory used by a value table.
+
+        Parameters
+        ----------
+        states_value : `dict`, `ValueTable`, `PolicyFile` or `LineValues`
+            Value function.
+        Returns
+        -------
+        footprint : `dict`
+            Entries and bytes, the bytes of a dictionary counting its keys and values.
+        """
+    if isinstance(states_value, (ValueTable, LineValues)):
+        nbytes = states_value.nbytes
+    elif isinstance(states_value, PolicyFile):
+        nbytes = POLICY_HEADER.size + 12 * len(states_value)
+    else:
+        nbytes = sys.getsizeof(states_value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in states_value.items())
+    return {"entries": len(states_value), "bytes": nbytes}
+
+
+def run_benchmarks(policy=None, N=3, rounds=2000, games=200, batch=None, seed=0, **settings):
+    """Runs the whole suite: training throughput, move latency, table footprint and strength of a policy
+    against random and optimal play.
+
+        Parameters
+        ----------
+        policy : `str`
+            Policy file to evaluate, in which case there is no training benchmark. By default the policy
+            trained by the throughput benchmark is evaluated.
+        N : `int`
+            Dimension of board game NxN
+        rounds : `int`
+            Number of training games.
+        games : `int`
+            Number of evaluation games against each opponent.
+        batch : `int`
+            If given, training games are played by `BatchSelfPlay` with this batch size.
+        seed : `int`
+            Seed of every random draw, so that runs can be compared.
+        settings :
+            Settings of the computers, see `Computer`.
+        Returns
+        -------
+        results : `dict`
+            Results, which can be dumped as json.
+        """
+    results = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+               "N": N, "seed": seed, "settings": settings}
+    if policy is None:
+        results["training"], computer = benchmark_training(rounds, N, batch=batch, seed=seed, **settings)
+    else:
+        computer = Computer("policy", **settings)
+        computer.load_policy(policy)
+        results["policy"] = os.path.abspath(policy)
+    computer.epsilon = 0
+    results["table"] = table_footprint(computer.states_value)
+    results["choose_action"] = benchmark_choose_action(computer, N, seed=seed)
+    results["vs_random"] = evaluate(computer, Computer("random", epsilon=1), N, games, seed)
+    results["vs_optimal"] = evaluate(computer, Solver("solver"), N, games, seed)
+    return results
+
+
+def write_results(results, file=None):
+    """Writes results as json to a file, or to stdout."""
+    if file is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(file, 'w') as fp:
+            json.dump(results, fp, indent=2)
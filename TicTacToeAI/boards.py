@@ -0,0 +1,340 @@
+import functools
+
+import numpy as np
+
+ZOBRIST_SEED = 0x5EED
+
+
+def rotate(board):
+    """Performs rotation of a board matrix.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        Returns
+        -------
+        new : `list`
+            Rotation matrix.
+        """
+    N = int(np.sqrt(len(board)))
+    table = [[board[i*N+j] for j in range(N)] for i in range(N)]
+    output = list(list(x)[::-1] for x in zip(*table))
+    new = []
+    for i in range(N):
+        new += output[i]
+    return new
+
+def transpose(board):
+    """Performs transpose of a board matrix.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        Returns
+        -------
+        new : `list`
+            Transpose matrix.
+        """
+    N = int(np.sqrt(len(board)))
+    m = [[board[i*N+j] for j in range(N)] for i in range(N)]
+    output = [[m[j][i] for j in range(len(m))] for i in range(len(m[0]))] 
+    new = []
+    for i in range(N):
+        new += output[i]
+    return new
+
+@functools.lru_cache(maxsize=None)
+def symmetries(size):
+    """Precomputes the 8 symmetries of a square board (rotations and their transposes) as permutation tables,
+    so that `[board[i] for i in perm]` is the transformed board.
+        
+        Parameters
+        ----------
+        size : `int`
+            Number of positions on the board, N*N.
+        Returns
+        -------
+        perms : `tuple`
+            8 tuples of positions, the identity first.
+        """
+    state = list(range(size))
+    perms = [tuple(state), tuple(transpose(state))]
+    for i in range(3):
+        state = rotate(state)
+        perms.append(tuple(state))
+        perms.append(tuple(transpose(state)))
+    return tuple(perms)
+
+def canonical(board):
+    """Picks the representative of a board's symmetry class, the smallest of its 8 symmetric copies.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        Returns
+        -------
+        res : `list`
+            List representing the canonical board.
+        """
+    return list(min(tuple(board[i] for i in perm) for perm in symmetries(len(board))))
+
+def stabilizer(board, hashes=None):
+    """Finds the symmetries which leave a board unchanged.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        hashes : `list`
+            Zobrist hashes of the board and its symmetric copies, if known: only the copies hashing like the board are compared.
+        Returns
+        -------
+        perms : `list`
+            Permutations of `symmetries` mapping the board to itself, the identity first.
+        """
+    perms = symmetries(len(board))
+    if hashes is not None:
+        return [perm for perm, h in zip(perms, hashes) if h == hashes[0] and [board[i] for i in perm] == board]
+    return [perm for perm in perms if [board[i] for i in perm] == board]
+
+def unique_positions(board, positions, hashes=None, keep="first"):
+    """Keeps one position per class of moves leading to symmetric boards, e.g. 3 of the 9 opening moves on 3x3.
+    Two positions are in the same class when a symmetry of the board maps one onto the other.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        positions : `list`
+            Available positions.
+        hashes : `list`
+            Zobrist hashes of the board and its symmetric copies, if known, to speed up `stabilizer`.
+        keep : `str`
+            "first" or "last": which position of each class is kept, in the order of positions.
+        Returns
+        -------
+        unique : `list`
+            Kept positions, in the order of positions.
+        """
+    perms = stabilizer(board, hashes)
+    if len(perms) == 1:
+        return positions
+    ordered = positions if keep == "first" else positions[::-1]
+    unique, seen = [], set()
+    for p in ordered:
+        if p not in seen:
+            unique.append(p)
+            seen.update(perm[p] for perm in perms)
+    return unique if keep == "first" else unique[::-1]
+
+@functools.lru_cache(maxsize=None)
+def zobrist_tables(size):
+    """Draws the Zobrist tables of a board, from a fixed seed so that keys are the same across runs and processes.
+    The i-th table is indexed by the positions of the i-th symmetric copy given by `symmetries(size)`,
+    so that XORing `tables[i][position][symbol]` for every taken position gives the hash of that copy.
+        
+        Parameters
+        ----------
+        size : `int`
+            Number of positions on the board, N*N.
+        Returns
+        -------
+        tables : `tuple`
+            8 tables of one pair of 64-bit integers (player 1, player 2) per position.
+        """
+    rng = np.random.default_rng([ZOBRIST_SEED, size])
+    table = rng.integers(0, 2**64, size=(size, 2), dtype=np.uint64).tolist()
+    tables = []
+    for perm in symmetries(size):
+        inverse = [0]*size
+        for i, p in enumerate(perm):
+            inverse[p] = i
+        tables.append(tuple(tuple(table[inverse[p]]) for p in range(size)))
+    return tuple(tables)
+
+@functools.lru_cache(maxsize=None)
+def zobrist_array(size):
+    """`zobrist_tables` as a read-only (8, size, 2) uint64 array, to hash many moves at once."""
+    array = np.array(zobrist_tables(size), dtype=np.uint64)
+    array.flags.writeable = False
+    return array
+
+@functools.lru_cache(maxsize=None)
+def symmetry_arrays(size):
+    """`symmetries` as arrays, to find the canonical copies of many boards at once.
+        
+        Parameters
+        ----------
+        size : `int`
+            Number of positions on the board, N*N.
+        Returns
+        -------
+        perms : `numpy.ndarray`
+            Read-only (8, size) permutations.
+        weights : `numpy.ndarray`
+            Read-only base 3 weights, position 0 weighing the most, so that weighted sums of boards order them
+            like their tuples. None when boards don't fit in 63 bits, from 7x7 on.
+        """
+    perms = np.array(symmetries(size), dtype=np.intp)
+    perms.flags.writeable = False
+    if 3**size >= 2**63:
+        return perms, None
+    weights = np.array([3**(size - 1 - i) for i in range(size)], dtype=np.int64)
+    weights.flags.writeable = False
+    return perms, weights
+
+def zobrist_hashes(board):
+    """Hashes a board and its symmetric copies from scratch.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        Returns
+        -------
+        hashes : `list`
+            8 Zobrist hashes, the board's own hash first.
+        """
+    hashes = []
+    for table in zobrist_tables(len(board)):
+        h = 0
+        for p, symbol in enumerate(board):
+            if symbol != 2:
+                h ^= table[p][symbol]
+        hashes.append(h)
+    return hashes
+
+@functools.lru_cache(maxsize=None)
+def line_masks(N, k=None):
+    """Precomputes the bit masks of every winning line (rows, columns and both diagonals) of a NxN board.
+    When k is less than N, the winning lines are all the windows of k consecutive positions along a row,
+    a column or any diagonal, so that each position is only on a bounded number of them.
+        
+        Parameters
+        ----------
+        N : `int`
+            Dimension of board game NxN
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        Returns
+        -------
+        lines : `tuple`
+            One integer mask per line.
+        """
+    if k is None or k == N:
+        lines = []
+        for i in range(N):
+            lines.append(sum(1 << (i*N+j) for j in range(N)))
+            lines.append(sum(1 << (j*N+i) for j in range(N)))
+        lines.append(sum(1 << (i*N+i) for i in range(N)))
+        lines.append(sum(1 << (i*N+N-i-1) for i in range(N)))
+        return tuple(lines)
+    lines = []
+    # right, down, down-right and down-left from each starting cell whose window stays on the board
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(N):
+            for col in range(N):
+                end_row, end_col = row + dr*(k - 1), col + dc*(k - 1)
+                if 0 <= end_row < N and 0 <= end_col < N:
+                    lines.append(sum(1 << ((row + dr*i)*N + col + dc*i) for i in range(k)))
+    return tuple(lines)
+
+@functools.lru_cache(maxsize=None)
+def cell_lines(N, k=None):
+    """Precomputes, for each position of a NxN board, the indices in `line_masks(N, k)` of the lines going through it.
+        
+        Parameters
+        ----------
+        N : `int`
+            Dimension of board game NxN
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        Returns
+        -------
+        lines_through : `tuple`
+            One tuple of line indices per position.
+        """
+    through = [[] for position in range(N*N)]
+    for i, line in enumerate(line_masks(N, k)):
+        while line:
+            low = line & -line
+            through[low.bit_length() - 1].append(i)
+            line ^= low
+    return tuple(tuple(lines) for lines in through)
+
+@functools.lru_cache(maxsize=None)
+def neighbourhood_masks(N, radius):
+    """Precomputes, for each position of a NxN board, the mask of the positions at most radius rows and columns away.
+        
+        Parameters
+        ----------
+        N : `int`
+            Dimension of board game NxN
+        radius : `int`
+            Distance, 1 for the 8 neighbours.
+        Returns
+        -------
+        masks : `tuple`
+            One integer mask per position, the position included.
+        """
+    masks = []
+    for row in range(N):
+        for col in range(N):
+            masks.append(sum(1 << (r*N + c) for r in range(max(row - radius, 0), min(row + radius + 1, N))
+                             for c in range(max(col - radius, 0), min(col + radius + 1, N))))
+    return tuple(masks)
+
+def board_key(board):
+    """Encodes a board as an integer, reading its symbols as base 3 digits.
+        
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+        Returns
+        -------
+        key : `int`
+            Base 3 number, position 0 being the least significant digit.
+        """
+    key = 0
+    for symbol in reversed(board):
+        key = 3*key + symbol
+    return key
+
+def key_board(key, size):
+    """Decodes a board encoded by `board_key`.
+        
+        Parameters
+        ----------
+        key : `int`
+            Base 3 number.
+        size : `int`
+            Number of positions on the board, N*N.
+        Returns
+        -------
+        board : `list`
+            List representing the board.
+        """
+    board = []
+    for i in range(size):
+        key, symbol = divmod(key, 3)
+        board.append(symbol)
+    return board
+
+def string_to_list(st):
+    """Converts a hashed board to list.
+        
+        Parameters
+        ----------
+        st : `string`
+            List representing a board as a string.
+        Returns
+        -------
+        res : `list`
+            List representing the board.
+        """
+    res = [int(s) for s in st[1:-1].split(", ")]
+    return res
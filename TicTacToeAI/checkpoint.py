@@ -0,0 +1,240 @@
+import os
+import pickle
+import threading
+
+from .game import RateLimited
+
+
+class Checkpointer:
+
+    def __init__(self, directory, game, every=1000, compact_every=10):
+        """ Constructor. Makes the training of a game resumable. Every few rounds, the values updated since the
+        previous checkpoint are appended to delta.log with the round count and the random generator state.
+        Once the log holds enough checkpoints it is folded into base.pkl by a background thread.
+
+        Parameters
+        ----------
+        directory : `str`
+            Directory of the checkpoint files, created if needed.
+
+        game : `Game`, `BatchSelfPlay` or `ParallelTrainer`
+            Trainer whose players are checkpointed.
+
+        every : `int`
+            Number of rounds between two checkpoints.
+
+        compact_every : `int`
+            Number of checkpoints in the log which triggers a compaction.
+        """
+        if "lines" in (game.p1.table, game.p2.table):
+            raise ValueError("the lines table has no entries to checkpoint")
+        os.makedirs(directory, exist_ok=True)
+        self.base = os.path.join(directory, "base.pkl")
+        self.log = os.path.join(directory, "delta.log")
+        self.rotated = self.log + ".1"  # log being compacted
+        self.game = game
+        self.every = every
+        self.compact_every = compact_every
+        self.round = 0
+        self.records = 0  # checkpoints in the log
+        self.lock = threading.Lock()
+        self.compaction = None
+        for player in self.players():
+            player.dirty = set()
+            if getattr(player.states_value, "evict", None) is not None:
+                player.states_value.dropped = set()
+
+
+    def players(self):
+        """The two players of the game."""
+        return (self.game.p1, self.game.p2)
+
+
+    def rng_state(self):
+        """State of the random generators the training draws from, and the sync count seeding parallel workers."""
+        rng = getattr(self.game, "rng", None)
+        return {"players": [player.rng_state() for player in self.players()],
+                "game": rng.bit_generator.state if rng is not None else None, "syncs": getattr(self.game, "syncs", None)}
+
+
+    def set_rng_state(self, state):
+        """Restores the state returned by `rng_state`."""
+        for player, player_state in zip(self.players(), state["players"]):
+            player.set_rng_state(player_state)
+        if state["game"] is not None:
+            self.game.rng.bit_generator.state = state["game"]
+        if state["syncs"] is not None:
+            self.game.syncs = state["syncs"]
+
+
+    def save(self):
+        """Appends a checkpoint to the log, compacting it in the background when it gets long."""
+        tables = []
+        for player in self.players():
+            if player.replay is not None:
+                player.replay.flush()
+            dropped = getattr(player.states_value, "dropped", None)
+            if dropped:
+                player.dirty.update(dropped)
+                dropped.clear()
+            if getattr(player.states_value, "evict", None) is not None:
+                # with the counters the evictions depend on, so that a resumed table evicts the same entries
+                tables.append({key: player.states_value.entry(key) for key in player.dirty})
+            else:
+                # None for the keys evicted from the table
+                tables.append({key: player.states_value.get(key) for key in player.dirty})
+            player.dirty = set()
+        record = {"round": self.round, "rng": self.rng_state(), "tables": tables,
+                  "table_rounds": [getattr(player.states_value, "round", 0) for player in self.players()]}
+        with self.lock:
+            with open(self.log, 'ab') as fp:
+                pickle.dump(record, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                fp.flush()
+                os.fsync(fp.fileno())
+            self.records += 1
+        if self.records >= self.compact_every and (self.compaction is None or not self.compaction.is_alive()):
+            with self.lock:
+                os.replace(self.log, self.rotated)
+                self.records = 0
+            self.compaction = threading.Thread(target=self.compact, daemon=True)
+            self.compaction.start()
+
+
+    def compact(self):
+        """Folds the rotated log into the base file, then removes it."""
+        state = self.read_base()
+        for record in read_records(self.rotated):
+            apply_record(state, record)
+        tmp = self.base + ".tmp"
+        with open(tmp, 'wb') as fp:
+            pickle.dump(state, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, self.base)
+        os.remove(self.rotated)
+
+
+    def read_base(self):
+        """Loads the base file, or an empty state."""
+        if not os.path.exists(self.base):
+            return {"round": 0, "rng": None, "tables": [{}, {}], "table_rounds": None}
+        with open(self.base, 'rb') as fp:
+            return pickle.load(fp)
+
+
+    def resume(self):
+        """Loads the latest checkpoint into the players and the random generators.
+
+        Returns
+        -------
+        round : `int`
+            Number of rounds already played, 0 if there is no checkpoint.
+        """
+        self.wait()
+        if os.path.exists(self.rotated):
+            # a compaction was interrupted
+            self.compact()
+        state = self.read_base()
+        self.records = 0
+        for record in read_records(self.log):
+            apply_record(state, record)
+            self.records += 1
+        if os.path.exists(self.log):
+            # drop a record cut short by a crash, so that new ones are appended after valid data
+            with open(self.log, 'r+b') as fp:
+                fp.truncate(valid_length(self.log))
+        for i, (player, table) in enumerate(zip(self.players(), state["tables"])):
+            if state.get("table_rounds") and hasattr(player.states_value, "round"):
+                player.states_value.round = state["table_rounds"][i]
+            for key, value in table.items():
+                if isinstance(value, tuple) and hasattr(player.states_value, "restore"):
+                    player.states_value.restore(key, *value)
+                else:
+                    player.states_value[key] = value[0] if isinstance(value, tuple) else value
+        if state["rng"] is not None:
+            self.set_rng_state(state["rng"])
+        self.round = state["round"]
+        return self.round
+
+
+    def training(self, rounds, progress=None, interval=0.1):
+        """ Trains the game until rounds games in total have been played, checkpointing along the way.
+
+        Parameters
+        ----------
+        rounds : `int`
+            Total number of games, including the ones played before resuming. A batched training resumes exactly
+            like an uninterrupted one only from a multiple of every, the games of a batch depending on its size.
+
+        progress : `callable`
+            Called as progress(done, rounds) after a checkpoint, at most once every interval seconds and after the last one.
+
+        interval : `float`
+            Minimum number of seconds between two calls to progress.
+        """
+        if progress is not None:
+            progress = RateLimited(progress, interval)
+        while self.round < rounds:
+            # chunks end on multiples of every, so that resuming plays the same chunks as an uninterrupted run
+            games = min(self.every - self.round % self.every, rounds - self.round)
+            self.game.training(games)
+            self.round += games
+            self.save()
+            if progress is not None:
+                progress(self.round, rounds)
+        self.wait()
+
+
+    def wait(self):
+        """Waits for a running compaction to finish."""
+        if self.compaction is not None:
+            self.compaction.join()
+
+
+def read_records(log):
+    """Reads the checkpoints of a log in order, ignoring a last record cut short by a crash.
+
+        Parameters
+        ----------
+        log : `str`
+            Path of the log, which may not exist.
+        Returns
+        -------
+        records : `generator`
+            Checkpoints as written by `Checkpointer.save`.
+        """
+    if not os.path.exists(log):
+        return
+    with open(log, 'rb') as fp:
+        while True:
+            try:
+                yield pickle.load(fp)
+            except (EOFError, pickle.UnpicklingError):
+                return
+
+
+def valid_length(log):
+    """Size of the complete records at the start of a log."""
+    length = 0
+    with open(log, 'rb') as fp:
+        while True:
+            try:
+                pickle.load(fp)
+            except (EOFError, pickle.UnpicklingError):
+                return length
+            length = fp.tell()
+
+
+def apply_record(state, record):
+    """Applies a checkpoint to a state read from the base file, unless the base already includes it."""
+    if record["round"] <= state["round"]:
+        return
+    state["round"] = record["round"]
+    state["rng"] = record["rng"]
+    state["table_rounds"] = record.get("table_rounds")
+    for table, delta in zip(state["tables"], record["tables"]):
+        for key, value in delta.items():
+            if value is None:
+                table.pop(key, None)
+            else:
+                table[key] = value
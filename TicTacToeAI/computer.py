@@ -0,0 +1,521 @@
+import json
+
+import numpy as np
+
+from .boards import (canonical, string_to_list, symmetries, symmetry_arrays, unique_positions, zobrist_array,
+                     zobrist_hashes, zobrist_tables)
+from .features import LineValues
+from .tables import POLICY_MAGIC, PolicyFile, ValueTable, get_many, publish_policy, write_policy
+
+
+class Computer:
+    
+    # number of uniform draws made at once by the generator of a computer
+    RANDOM_BLOCK = 4096
+    
+    def __init__(self, name, alpha=0.2, gamma=0.9, epsilon=0.3, symmetry="all", keys="string", table="dict", tie_break="last",
+                 moves="all", window=None, max_bytes=None, evict=None, seed=None, stats=None):
+        """ Constructor.
+    
+        Parameters
+        ----------
+        name : `str`
+            Name of computer player.
+        epsilon : `float`
+            Greedy rate for exploration-exploitation. 0.3 means 30% of random actions
+        symmetry : `str`
+            "all" writes each update into the 8 symmetric copies of a state,
+            "canonical" reads and writes only one representative per symmetry class.
+        keys : `str`
+            "string" keys the value function by the stringified board,
+            "zobrist" by the 64-bit Zobrist hash of the board.
+        table : `str`
+            "dict" stores the value function in a dictionary,
+            "array" in a compact `ValueTable`, which needs Zobrist keys,
+            "lines" approximates it with the fixed-size weights of a `LineValues`, which reads the boards themselves,
+            so keys and symmetry don't apply. It can't be merged by `ParallelTrainer` or checkpointed.
+        tie_break : `str`
+            Greedy move picked among the positions of equal value: "last" or "first" in the order of the
+            available positions, or "random".
+        moves : `str`
+            "all" picks among all the available positions, "unique" among one position per class of moves
+            leading to symmetric boards, see `unique_positions`. With the last or first tie break, greedy picks
+            are the same, only exploration and the number of lookups change. `BatchSelfPlay` plays all moves.
+        window : `int`
+            Number of positions of the windows read by the "lines" table, see `LineValues`.
+        max_bytes, evict :
+            Memory budget of the "array" table and the entries it evicts when it is full, see `ValueTable`.
+            The evicted entries are worth 0 again, as the states never visited.
+        seed : `int` or `numpy.random.SeedSequence`
+            Seed of the generator of the exploration decisions, random moves and random tie breaks.
+            Two computers with the same seed and settings play the same games.
+        stats : `Stats`
+            If given, greedy and random picks, table hits and misses and inserted states are counted in it.
+        """
+        if symmetry not in ("all", "canonical"):
+            raise ValueError("symmetry must be 'all' or 'canonical', got " + repr(symmetry))
+        if keys not in ("string", "zobrist"):
+            raise ValueError("keys must be 'string' or 'zobrist', got " + repr(keys))
+        if table not in ("dict", "array", "lines"):
+            raise ValueError("table must be 'dict', 'array' or 'lines', got " + repr(table))
+        if table == "array" and keys != "zobrist":
+            raise ValueError("the array table stores integer keys, use keys='zobrist'")
+        if tie_break not in ("last", "first", "random"):
+            raise ValueError("tie_break must be 'last', 'first' or 'random', got " + repr(tie_break))
+        if moves not in ("all", "unique"):
+            raise ValueError("moves must be 'all' or 'unique', got " + repr(moves))
+        if (max_bytes is not None or evict is not None) and table != "array":
+            raise ValueError("only the array table has a memory budget, use table='array'")
+                                                                                     
+        self.name = name
+        self.states = []  # record all positions taken during the game
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.gamma = gamma
+        self.symmetry = symmetry
+        self.keys = keys
+        self.table = table
+        self.tie_break = tie_break
+        self.moves = moves
+        self.max_bytes = max_bytes
+        self.evict = evict
+        self.size = None  # number of positions on the boards seen so far
+        self.visits = None  # set to a dictionary to count the updates of each key
+        self.dirty = None  # set to a set to collect the keys updated since it was last emptied
+        self.replay = None  # set by `ReplayLearner`, which then learns the games in batches
+        self.stats = stats
+        self.reseed(seed)
+        if table == "lines":
+            self.states_value = LineValues(window)
+        else:
+            self.states_value = ValueTable(max_bytes=max_bytes, evict=evict) if table == "array" else {}
+        
+
+    def choose_action(self, positions, current_board, symbol, hashes=None):
+        """Chooses an action depending on the available positions.
+    
+        Parameters
+        ----------
+        positions : `list`
+            List of available positions the agent can pick from.
+            
+        current_board : `list`
+            List representing the current board
+            
+        symbol : `int`
+            Symbol of current player.
+            
+        hashes : `list`
+            Zobrist hashes of the current board and its symmetric copies, if the game keeps track of them.
+            
+        Returns
+        -------
+        pick : `int`
+            Chosen position.
+        """
+        if self.moves == "unique":
+            positions = unique_positions(current_board, positions, hashes, "last" if self.tie_break == "last" else "first")
+        if self.random() <= self.epsilon:  # random action
+            idx = int(self.random() * len(positions))
+            action = positions[idx]
+            if self.stats is not None:
+                self.stats.counters["random"] += 1
+        elif self.table == "lines":
+            # only the windows through each position are read again
+            values = self.states_value.afterstate_values(current_board, positions, symbol).tolist()
+            action = positions[self.best_index(values)]
+            if self.stats is not None:
+                self.stats.counters["greedy"] += 1
+        else: # greedy action
+            keys = self.afterstate_keys(positions, current_board, symbol, hashes)
+            # Evaluate the value function for each possible outcome and pick the best one.
+            action = positions[self.best_index(self.afterstate_values(keys))]
+            if self.stats is not None:
+                hits = self.table_hits(keys)
+                self.stats.counters["greedy"] += 1
+                self.stats.counters["hits"] += hits
+                self.stats.counters["misses"] += len(keys) - hits
+        return action
+
+    
+    def afterstate_keys(self, positions, current_board, symbol, hashes=None):
+        """Computes the keys of the boards reached by playing each of the given positions.
+        With Zobrist keys they are derived from the hashes of the current board without copying it.
+    
+        Parameters
+        ----------
+        positions : `list`
+            List of available positions the agent can pick from.
+            
+        current_board : `list`
+            List representing the current board
+            
+        symbol : `int`
+            Symbol of current player.
+            
+        hashes : `list`
+            Zobrist hashes of the current board and its symmetric copies, computed from the board if not given.
+            
+        Returns
+        -------
+        keys : `list`
+            One key per position, or the afterstates themselves as the rows of an array with the "lines" table.
+        """
+        size = len(current_board)
+        if self.table == "lines":
+            boards = np.repeat(np.array([current_board], dtype=np.int8), len(positions), axis=0)
+            boards[np.arange(len(positions)), positions] = symbol
+            return boards
+        if self.keys == "string":
+            if self.symmetry == "all":
+                st = str(current_board)
+                if len(st) == 3*size:
+                    # "[a, b, ...]": the cell of position p is character 3p+1, only that one changes
+                    mark = str(symbol)
+                    return [st[:3*p + 1] + mark + st[3*p + 2:] for p in positions]
+            else:
+                perms, weights = symmetry_arrays(size)
+                if weights is not None:
+                    # all the afterstates at once, each replaced by its smallest symmetric copy
+                    boards = np.repeat(np.array([current_board], dtype=np.int64), len(positions), axis=0)
+                    boards[np.arange(len(positions)), positions] = symbol
+                    copies = boards[:, perms]
+                    smallest = (copies @ weights).argmin(axis=1)
+                    return [str(board) for board in copies[np.arange(len(positions)), smallest].tolist()]
+            keys = []
+            for p in positions:
+                next_board = current_board.copy() 
+                next_board[p] = symbol
+                keys.append(self.state_key(next_board))
+            return keys
+        if hashes is None:
+            hashes = zobrist_hashes(current_board)
+        if self.symmetry == "canonical":
+            tables = zobrist_array(size)[:, positions, symbol]
+            return (np.array(hashes, dtype=np.uint64)[:, None] ^ tables).min(axis=0).tolist()
+        h, table = hashes[0], zobrist_tables(size)[0]
+        return [h ^ table[p][symbol] for p in positions]
+
+
+    def afterstate_values(self, keys):
+        """Looks up the values of afterstates, 0 for the ones not in the table.
+        Zobrist keys go through a single vectorized lookup when the table has one.
+    
+        Parameters
+        ----------
+        keys : `list`
+            Keys given by `afterstate_keys`.
+            
+        Returns
+        -------
+        values : `list`
+            Value of each key.
+        """
+        if self.table == "lines":
+            return self.states_value.values(np.array(keys, dtype=np.int8).reshape(len(keys), -1)).tolist()
+        if self.replay is not None and self.replay.thread is not None:
+            # the table is written by the learner's thread
+            with self.replay.lock:
+                return get_many(self.states_value, np.array(keys, dtype=np.uint64)).tolist()
+        if self.keys == "zobrist" and hasattr(self.states_value, "get_many"):
+            return self.states_value.get_many(np.array(keys, dtype=np.uint64)).tolist()
+        get = self.states_value.get
+        return [get(key, 0) for key in keys]
+
+
+    def table_hits(self, keys):
+        """Number of keys found in the table, read under the lock of a threaded replay learner as in
+        `afterstate_values`, since its thread writes the table meanwhile."""
+        if self.replay is not None and self.replay.thread is not None:
+            with self.replay.lock:
+                return sum(1 for key in keys if key in self.states_value)
+        return sum(1 for key in keys if key in self.states_value)
+
+
+    def best_index(self, values):
+        """Index of the highest value, ties being broken as set by tie_break.
+    
+        Parameters
+        ----------
+        values : `list`
+            Values of the available positions.
+            
+        Returns
+        -------
+        index : `int`
+            Index of the picked position.
+        """
+        best = max(values)
+        if self.tie_break == "first":
+            return values.index(best)
+        if self.tie_break == "last":
+            return len(values) - 1 - values[::-1].index(best)
+        ties = [i for i, value in enumerate(values) if value == best]
+        return ties[int(self.random() * len(ties))] if len(ties) > 1 else ties[0]
+
+
+    def reseed(self, seed=None):
+        """Replaces the generator of the computer by a new one seeded with seed, e.g. a child of
+        `numpy.random.SeedSequence.spawn` to give parallel workers independent streams."""
+        self.rng = np.random.default_rng(seed)
+        self.block_state = None  # state of the generator before it drew the current block
+        self.draws = []
+        self.drawn = 0
+
+
+    def random(self):
+        """Next uniform draw in [0, 1) of the generator, which draws them by blocks of RANDOM_BLOCK."""
+        if self.drawn == len(self.draws):
+            self.block_state = self.rng.bit_generator.state
+            self.draws = self.rng.random(self.RANDOM_BLOCK).tolist()
+            self.drawn = 0
+        self.drawn += 1
+        return self.draws[self.drawn - 1]
+
+
+    def rng_state(self):
+        """State of the generator, the current block being recorded as the state it was drawn from."""
+        if self.block_state is None:
+            return {"state": self.rng.bit_generator.state, "drawn": None}
+        return {"state": self.block_state, "drawn": self.drawn}
+
+
+    def set_rng_state(self, state):
+        """Restores the state returned by `rng_state`, drawing the current block again."""
+        self.rng.bit_generator.state = state["state"]
+        self.block_state, self.draws, self.drawn = None, [], 0
+        if state["drawn"] is not None:
+            self.random()
+            self.drawn = state["drawn"]
+
+    
+    def state_key(self, state, hashes=None):
+        """Hashes a board into the key used in the value function.
+    
+        Parameters
+        ----------
+        state : `list`
+            List representing the board.
+            
+        hashes : `list`
+            Zobrist hashes of the board and its symmetric copies, computed from the board if not given.
+            
+        Returns
+        -------
+        key : `str` or `int`
+            The board itself as a string or its Zobrist hash, or the key of its canonical representative in "canonical" mode.
+        """
+        if self.keys == "zobrist":
+            if hashes is None:
+                hashes = zobrist_hashes(state)
+            return min(hashes) if self.symmetry == "canonical" else hashes[0]
+        if self.symmetry == "canonical":
+            return str(canonical(state))
+        return str(state)
+   
+    
+    def add_state(self, state, hashes=None):
+        """Adds a state/board to storage for this game.
+    
+        Parameters
+        ----------
+        state : `list`
+            List representing the board to memory.
+            
+        hashes : `list`
+            Zobrist hashes of the board and its symmetric copies, computed from the board if not given.
+        """
+        self.states.append(self.stored_state(state, hashes))
+        self.size = len(state)
+        
+        
+    def stored_state(self, state, hashes=None):
+        """Entry kept by `add_state` for a board, in the format `update_policy` expects in self.states.
+    
+        Parameters
+        ----------
+        state : `list`
+            List representing the board.
+            
+        hashes : `list`
+            Zobrist hashes of the board and its symmetric copies, computed from the board if not given.
+            
+        Returns
+        -------
+        entry : `str`, `int`, `tuple` or `bytes`
+            Key of the board, or the hashes of all its symmetric copies with Zobrist keys and symmetry "all",
+            or the board itself as bytes with the "lines" table.
+        """
+        if self.table == "lines":
+            return bytes(state)
+        if self.keys == "zobrist" and self.symmetry == "all":
+            # keep the hashes of all symmetric copies, the board's own hash first
+            if hashes is None:
+                hashes = zobrist_hashes(state)
+            return tuple(hashes)
+        return self.state_key(state, hashes)
+        
+                                                                
+    def update_policy(self, reward):
+        """Based on reward received by the player (1 if wins, 0 if loses or else), 
+        updates the state-value function/policy for all visited states during the game.
+    
+        Parameters
+        ----------
+        reward : `float`
+            Reward received by the player.
+        """
+        if isinstance(self.states_value, PolicyFile):
+            raise TypeError("policy is mapped read-only, load it with mmap=False to keep learning")
+        if self.replay is not None:
+            self.replay.push(self.states, reward)
+            return
+        if self.table == "lines":
+            if self.states:
+                boards = np.frombuffer(b"".join(self.states), dtype=np.int8).reshape(len(self.states), -1)
+                self.states_value.learn(boards, reward, self.alpha, self.gamma)
+            return
+        if self.evict is not None:
+            # the states of this game are the ones updated in the new round, which are evicted last
+            self.states_value.tick()
+        for st in reversed(self.states):
+            if self.symmetry == "canonical":
+                optimization = (st,)
+            elif self.keys == "zobrist":
+                st, optimization = st[0], set(st)
+            else:
+                state = string_to_list(st)
+                optimization = {str([state[i] for i in perm]) for perm in symmetries(len(state))}
+            if self.states_value.get(st) is None:
+                for inv in optimization:
+                    self.states_value[inv] = 0
+                if self.stats is not None:
+                    self.stats.counters["inserted"] += len(optimization)
+            for inv in optimization:
+                # an evicted symmetric copy counts from 0 again
+                value = self.states_value.get(inv, 0)
+                self.states_value[inv] = value + self.alpha * (self.gamma * reward - value)
+            if self.visits is not None:
+                for inv in optimization:
+                    self.visits[inv] = self.visits.get(inv, 0) + 1
+            if self.dirty is not None:
+                self.dirty.update(optimization)
+            # read back, rounded as the table stores it. Only a budget smaller than a game can have evicted it
+            reward = self.states_value.get(st, 0)
+
+            
+    def reset(self):
+        """Clear storage for latest game."""
+        self.states = []
+        
+        
+    def save_policy(self, format="json", file=None, N=None):
+        """Save policy dictionary to file.
+    
+        Parameters
+        ----------
+        format : `str`
+            "json" writes policy_<name>.json, "binary" writes policy_<name>.bin, see `write_policy`.
+            The weights of the "lines" table are written to policy_<name>.npz whatever the format.
+        file : `str`
+            Path to write to instead of the default one.
+        N : `int`
+            Dimension of the boards, recorded in a binary policy. Needed when `board_dimension` can't tell it,
+            e.g. for zobrist keys before any game was played.
+        """
+        if self.table == "lines":
+            self.states_value.save('policy_' + str(self.name) + '.npz' if file is None else file)
+            return
+        if file is None:
+            file = 'policy_' + str(self.name) + ('.bin' if format == "binary" else '.json')
+        if format == "binary":
+            write_policy(file, self.states_value, N or self.board_dimension(), self.alpha, self.gamma, self.keys,
+                         self.symmetry)
+            return
+        with open(file, 'w') as fp:
+            json.dump(dict(self.states_value.items()), fp)
+            fp.close()
+
+
+    def share_policy(self, name=None, N=None):
+        """Publishes the policy in shared memory with `publish_policy` and plays from there, read-only.
+        Other processes load the returned file, and a computer sent to a worker process is pickled as that path,
+        so that all of them map the same memory instead of holding a copy of the table each.
+    
+        Parameters
+        ----------
+        name : `str`
+            Name of the shared file, a unique one by default.
+
+        N : `int`
+            Dimension of the boards, see `save_policy`.
+            
+        Returns
+        -------
+        file : `str`
+            Path of the shared policy, to remove with os.remove once no new process needs it.
+        """
+        if self.table == "lines":
+            raise ValueError("the weights of the lines table are small enough to be copied to each process")
+        file = publish_policy(self.states_value, N or self.board_dimension(), self.alpha, self.gamma, self.keys,
+                              self.symmetry, name)
+        self.load_policy(file)
+        return file
+
+
+    def board_dimension(self):
+        """Dimension N of the boards in the table, 0 if it is unknown."""
+        size = self.size
+        if size is None and self.keys == "string" and len(self.states_value):
+            size = len(string_to_list(next(iter(self.states_value))))
+        return int(np.sqrt(size)) if size else 0
+
+        
+    def load_policy(self, file, mmap=True):
+        """Load policy from a json file to dictonary, or from a binary file, or the weights of a "lines" table.
+    
+        Parameters
+        ----------
+        file : `str`
+            Path of the policy file, the format is guessed from its first bytes.
+        mmap : `bool`
+            If True, a binary file is memory-mapped as a read-only `PolicyFile`, which is enough to play.
+            If False, its entries are copied into the table of the computer so that it can keep learning.
+        """
+        with open(file, 'rb') as fp:
+            magic = fp.read(len(POLICY_MAGIC))
+        if self.table == "lines":
+            if not magic.startswith(b"PK"):
+                raise ValueError(file + " isn't the .npz weights of a lines table")
+            self.states_value = LineValues.load(file)
+            self.size = None if self.states_value.N is None else self.states_value.N**2
+            return
+        binary = magic == POLICY_MAGIC
+        if binary:
+            policy = PolicyFile(file)
+            if policy.keys_scheme != ("zobrist" if self.keys == "zobrist" else "board") or policy.symmetry != self.symmetry:
+                policy.close()
+                raise ValueError(file + " holds " + policy.keys_scheme + " keys with symmetry " + repr(policy.symmetry)
+                                 + ", which doesn't match this computer")
+            self.size = policy.N * policy.N
+            if mmap:
+                self.states_value = policy
+                return
+            if self.table == "array":
+                table = ValueTable(capacity=len(policy), max_bytes=self.max_bytes, evict=self.evict)
+                table.set_many(policy.keys_array, policy.values_array)
+            else:
+                table = dict(policy.items())
+            policy.close()
+            self.states_value = table
+            return
+        with open(file, 'r') as fp:
+            self.states_value = json.load(fp)
+            fp.close()
+        if self.keys == "zobrist":
+            # json only has string keys
+            self.states_value = {int(k): v for k, v in self.states_value.items()}
+        if self.table == "array":
+            table = ValueTable(capacity=len(self.states_value), max_bytes=self.max_bytes, evict=self.evict)
+            table.update(self.states_value)
+            self.states_value = table
@@ -0,0 +1,204 @@
+import numpy as np
+
+from .boards import line_masks, symmetries
+
+
+class LineValues:
+
+    def __init__(self, window=None):
+        """ Constructor. Value function approximated by an n-tuple network over the lines of the board.
+        Every window of `window` aligned positions reads its cells as a base 3 pattern, which indexes a table of
+        weights, and the value of a board is the sum of the weights of its windows. Windows mapped onto each other
+        by a symmetry of the board share their table, a pattern and its reverse share their weight, so that the values
+        of symmetric boards are equal, and the all-empty pattern is worth 0 so that only the
+        windows with a symbol on them count. The weights are allocated for the size of the first board seen and
+        never grow, however many boards are visited.
+
+        Parameters
+        ----------
+        window : `int`
+            Number of positions of each window, min(N, 5) by default.
+        """
+        self.window = window
+        self.N = None
+        self.weights = None
+
+
+    def prepare(self, size):
+        """Builds the windows and allocates the weights for boards of size positions, on the first call only."""
+        if self.N is not None:
+            return
+        N = int(np.sqrt(size))
+        window = min(N, 5) if self.window is None else self.window
+        if not 1 <= window <= N:
+            raise ValueError("window must be between 1 and N, got " + str(window))
+        masks = line_masks(N, window)
+        cells = [[p for p in range(size) if mask >> p & 1] for mask in masks]
+        index = {mask: i for i, mask in enumerate(masks)}
+        # the lines perm[R] a symmetric copy reads in place of R share R's table
+        tables = [None]*len(masks)
+        n_tables = 0
+        for i, line in enumerate(cells):
+            if tables[i] is not None:
+                continue
+            for perm in symmetries(size):
+                j = index[sum(1 << perm[p] for p in line)]
+                if tables[j] is None:
+                    tables[j] = n_tables
+            n_tables += 1
+        self.N = N
+        self.window = window
+        self.orders = np.array(cells, dtype=np.intp)  # (lines, window) positions read by each line
+        self.powers = 3 ** np.arange(window)
+        self.empty = int(2 * self.powers.sum())  # pattern of a line without any symbol
+        # a symmetry can reverse a line, so each pattern is read as the smaller of itself and its reverse
+        digits = np.arange(3**window)[:, None] // self.powers % 3
+        self.canonical = np.minimum(digits @ self.powers, digits @ self.powers[::-1])
+        self.offsets = np.array(tables, dtype=np.intp) * 3**window  # start of each line's table in the weights
+        # for each position, the lines through it, padded with a line of index -1, and the power of the position in them
+        through = [[(i, order.index(p)) for i, order in enumerate(cells) if p in order] for p in range(size)]
+        width = max(len(lines) for lines in through)
+        self.through = np.array([[i for i, j in lines] + [-1]*(width - len(lines)) for lines in through], dtype=np.intp)
+        self.through_powers = np.array([[3**j for i, j in lines] + [0]*(width - len(lines)) for lines in through],
+                                       dtype=np.int64)
+        # one more weight, always 0, read by the padding lines
+        self.padding = n_tables * 3**window
+        self.weights = np.zeros(self.padding + 1, dtype=np.float64)
+
+
+    def features(self, boards):
+        """Indices in the weights of the windows of each board, and which of them hold a symbol.
+
+        Parameters
+        ----------
+        boards : `numpy.ndarray`
+            (B, N*N) boards.
+
+        Returns
+        -------
+        indices : `numpy.ndarray`
+            (B, lines) weight indices.
+
+        active : `numpy.ndarray`
+            (B, lines) mask of the windows with at least one symbol.
+
+        patterns : `numpy.ndarray`
+            (B, lines) patterns as read, before being mapped to the smaller of them and their reverse.
+        """
+        patterns = boards[:, self.orders].astype(np.int64) @ self.powers
+        return self.offsets + self.canonical[patterns], patterns != self.empty, patterns
+
+
+    def values(self, boards):
+        """Values of boards.
+
+        Parameters
+        ----------
+        boards : `numpy.ndarray`
+            (B, N*N) boards.
+
+        Returns
+        -------
+        values : `numpy.ndarray`
+            Value of each board.
+        """
+        boards = np.asarray(boards)
+        self.prepare(boards.shape[1])
+        indices, active, patterns = self.features(boards)
+        return self.weights[indices].sum(axis=1)
+
+
+    def afterstate_values(self, board, positions, symbol):
+        """Values of the boards reached by playing each position, only reading again the windows through it.
+
+        Parameters
+        ----------
+        board : `list`
+            Current board.
+
+        positions : `list`
+            Empty positions.
+
+        symbol : `int`
+            Symbol of the player.
+
+        Returns
+        -------
+        values : `numpy.ndarray`
+            Value of each afterstate.
+        """
+        self.prepare(len(board))
+        indices, active, patterns = self.features(np.array([board]))
+        indices, patterns = indices[0], patterns[0]
+        lines = self.through[positions]
+        before = indices[lines]
+        after = self.offsets[lines] + self.canonical[patterns[lines] + (symbol - 2) * self.through_powers[positions]]
+        # the padding lines read the weight of 0 both before and after the move
+        before[lines < 0] = after[lines < 0] = self.padding
+        return self.weights[indices].sum() + (self.weights[after] - self.weights[before]).sum(axis=1)
+
+
+    def learn(self, boards, reward, alpha, gamma):
+        """Temporal difference update of the states of a game, as `Computer.update_policy` does with a table.
+        The new values are computed backwards from the reward in one pass over the values, then the weights of all
+        the states are moved at once. Each state's step is split between its windows, so that its value moves by
+        alpha times its error, as an entry of a table would.
+
+        Parameters
+        ----------
+        boards : `numpy.ndarray`
+            (T, N*N) states of the player during the game, in the order they were reached.
+
+        reward : `float`
+            Reward received by the player.
+
+        alpha, gamma : `float`
+            Learning rate and discount.
+        """
+        self.prepare(boards.shape[1])
+        indices, active, patterns = self.features(boards)
+        values = self.weights[indices].sum(axis=1)
+        steps = np.empty(len(boards))
+        for t in range(len(boards) - 1, -1, -1):
+            steps[t] = alpha * (gamma * reward - values[t])
+            reward = values[t] + steps[t]
+        steps /= np.maximum(active.sum(axis=1), 1)
+        np.add.at(self.weights, indices[active], np.broadcast_to(steps[:, None], indices.shape)[active])
+
+
+    def copy(self):
+        """Independent copy of the weights."""
+        other = LineValues(self.window)
+        other.__dict__.update(self.__dict__)
+        if self.weights is not None:
+            other.weights = self.weights.copy()
+        return other
+
+
+    def __len__(self):
+        """Number of weights."""
+        return 0 if self.weights is None else self.padding
+
+
+    @property
+    def nbytes(self):
+        """Memory used by the weights."""
+        return 0 if self.weights is None else self.weights.nbytes
+
+
+    def save(self, file):
+        """Writes the weights to a file in the .npz format, whatever its extension."""
+        with open(file, 'wb') as fp:
+            np.savez(fp, N=self.N or 0, window=self.window or 0,
+                     weights=self.weights[:-1] if self.weights is not None else [])
+
+
+    @classmethod
+    def load(cls, file):
+        """Reads weights written by `save`."""
+        with np.load(file) as data:
+            values = cls(int(data["window"]) or None)
+            if int(data["N"]):
+                values.prepare(int(data["N"])**2)
+                values.weights[:-1] = data["weights"]
+        return values
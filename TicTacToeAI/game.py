@@ -0,0 +1,673 @@
+import time
+
+from .boards import cell_lines, line_masks, neighbourhood_masks, zobrist_tables
+
+
+class Game:
+    
+    def __init__(self, p1, p2, N, bitboard=False, incremental=False, zobrist=False, stats=None, k=None, near=None):
+        """ Constructor.
+    
+        Parameters
+        ----------
+        p1 : `Player`
+            First player
+
+        p2 : `Player`
+            Second player
+
+        N : `int`
+            Dimension of board game NxN
+
+        bitboard : `bool`
+            If True, legal moves, wins and ties are computed on a `Bitboard` kept alongside the board list.
+
+        incremental : `bool`
+            If True, wins and ties are detected by a `LineCounter` which only looks at the lines through the last move.
+
+        zobrist : `bool`
+            If True, the Zobrist hashes of the board and of its 7 symmetric copies are updated by XOR at each move
+            and handed to the players so that they don't have to hash the board themselves.
+
+        stats : `Stats`
+            If given, the phases of each move of the training are timed and counted in it.
+
+        k : `int`
+            Number of aligned positions which wins, N by default. When it is less than N, a `LineCounter` is always
+            used, since the scans of whole rows, columns and diagonals can't see shorter lines.
+
+        near : `int`
+            If given, only the empty positions at most near rows and columns away from a played one are available,
+            the whole board being available before the first move.
+        """
+        if k is None:
+            k = N
+        if not 1 <= k <= N:
+            raise ValueError("k must be between 1 and N, got " + str(k))
+        if near is not None and near < 1:
+            raise ValueError("near must be at least 1, got " + str(near))
+        # 2 is empty spot, 0 is player 1's symbol, 1 is player 2's symbol
+        self.board = [2 for i in range(N*N)] 
+        self.p1 = p1
+        self.p2 = p2
+        self.N = N
+        self.k = k
+        self.bitboard = Bitboard(N, k) if bitboard else None
+        self.counter = LineCounter(N, k) if incremental or k != N else None
+        self.near = near
+        self.frontier = 0  # mask of the positions near a played one, when near is given
+        self.frontiers = []  # previous masks, to undo moves
+        self.hashes = [0]*8 if zobrist else None
+        self.stats = stats
+        self.gameStillGoing = True
+        self.winner = None
+        # initialize to who plays first
+        self.currentPlayer = 0 
+        self.moves = 0  # moves played since the game was created, across resets
+
+        
+    def show_board(self):
+        """ Display board at it's current state. "_" is an empty position, "o" is player 1, "x" is player 2"""
+        for i in range(self.N):
+            line = " "
+            for j in range(self.N):
+                if self.board[i*self.N+j] == 0:
+                    line = line+" o "
+                if self.board[i*self.N+j] == 1:
+                    line = line+" x "
+                if self.board[i*self.N+j] == 2:
+                    line = line+" _ "
+                if j < self.N-1:
+                    line = line+"|"
+            print(line)
+        print("")
+        
+        
+    def update_board(self, position):
+        """ Handles a turn using the current player's symbol and the chosen position to update the board and then flip player.
+
+        Parameters
+        ----------
+        position : `int`
+            Selected position in the hashed board as an integer between 0 and N*N.
+        """
+        self.board[position] = self.currentPlayer
+        self.moves += 1
+        if self.bitboard is not None:
+            self.bitboard.place(position, self.currentPlayer)
+        if self.counter is not None:
+            self.counter.place(position, self.currentPlayer)
+        if self.hashes is not None:
+            self.update_hashes(position, self.currentPlayer)
+        if self.near is not None:
+            self.frontiers.append(self.frontier)
+            self.frontier |= neighbourhood_masks(self.N, self.near)[position]
+        if self.currentPlayer == 0:
+            self.currentPlayer = 1
+        elif self.currentPlayer == 1:
+            self.currentPlayer = 0
+    
+    
+    def undo_board(self, position):
+        """ Takes back the last move, played at the given position, and gives the hand back to the player who made it.
+
+        Parameters
+        ----------
+        position : `int`
+            Position of the last move in the hashed board as an integer between 0 and N*N.
+        """
+        symbol = self.board[position]
+        self.board[position] = 2
+        if self.bitboard is not None:
+            self.bitboard.remove(position, symbol)
+        if self.counter is not None:
+            self.counter.remove(position, symbol)
+        if self.hashes is not None:
+            self.update_hashes(position, symbol)
+        if self.near is not None:
+            self.frontier = self.frontiers.pop()
+        self.currentPlayer = symbol
+        self.winner = None
+        self.gameStillGoing = True
+    
+    
+    def update_hashes(self, position, symbol):
+        """ XORs a move in or out of the Zobrist hashes of the board and of its symmetric copies.
+
+        Parameters
+        ----------
+        position : `int`
+            Position of the move in the hashed board as an integer between 0 and N*N.
+
+        symbol : `int`
+            Symbol of the player, 0 or 1.
+        """
+        tables = zobrist_tables(self.N*self.N)
+        for i in range(8):
+            self.hashes[i] ^= tables[i][position][symbol]
+    
+    
+    def available_positions(self):
+        """Searches for position currently available so that the next player can choose next action.
+
+        Returns
+        -------
+        positions : `list`
+            It contains current empty position on the board game.
+
+        """
+        if self.frontier:
+            # only walks the neighbourhood of the played positions, however large the board is
+            positions = []
+            frontier = self.frontier
+            while frontier:
+                low = frontier & -frontier
+                position = low.bit_length() - 1
+                if self.board[position] == 2:
+                    positions.append(position)
+                frontier ^= low
+            return positions
+        if self.bitboard is not None:
+            return self.bitboard.available_positions()
+        positions = []
+        for i in range(self.N):
+            for j in range(self.N):
+                if self.board[i*self.N+j] == 2:
+                    # adds empty position to the list
+                    positions.append(i*self.N+j)
+        return positions
+    
+    
+    def check_if_game_over(self):
+        """Checks if game ends with a winner or a tie."""
+        self.check_for_winner()
+        self.check_if_tie()
+        
+        
+    def check_for_winner(self):
+        """Checks whether one player wins the game. If so, the variable self.winner is assigned with the symbol of the player who wins. """
+        if self.counter is not None:
+            self.winner = self.counter.winner
+            if self.winner is not None:
+                self.gameStillGoing = False
+            return
+        if self.bitboard is not None:
+            self.winner = self.bitboard.winner()
+            if self.winner is not None:
+                self.gameStillGoing = False
+            return
+        # check rows
+        row_winner = self.check_rows()
+        # check columns
+        column_winner = self.check_columns()
+        # check diagonals
+        diagonal_winner = self.check_diagonals()
+    
+    
+        if row_winner == 0 or row_winner == 1:
+            self.winner = row_winner
+        elif column_winner == 0 or column_winner == 1:
+            self.winner = column_winner
+        elif diagonal_winner == 0 or diagonal_winner == 1:
+            self.winner = diagonal_winner
+        else:
+            self.winner = None
+        return
+
+    
+    def check_rows(self):
+        """Searches for a full horizontal row. If one is found, the flag self.gameStillGoing flips to False.
+
+        Returns
+        -------
+        winning_player : `int`
+            Symbol of the winner if there is one.
+        """
+        winning_player = 2
+        for row in range(self.N):
+            win = True
+            for col in range(1,self.N):
+                if self.board[row*self.N+col-1] != self.board[row*self.N+col] or self.board[row*self.N+col] == 2:
+                    win = False
+                    break
+            if win:
+                winning_player = self.board[row*self.N]
+                self.gameStillGoing = False
+                break        
+        if winning_player != 2:
+            return winning_player
+        return
+
+    
+    def check_columns(self):
+        """Searches for a full vertical row. If one is found, the flag self.gameStillGoing flips to False.
+
+        Returns
+        -------
+        winning_player : `int`
+            Symbol of the winner if there is one.
+        """
+        winning_player = 2
+        for col in range(self.N):
+            win = True
+            for row in range(1,self.N):
+                if self.board[(row-1)*self.N+col] != self.board[row*self.N+col] or self.board[row*self.N+col] == 2:
+                    win = False
+                    break
+            if win:
+                winning_player = self.board[col]
+                self.gameStillGoing = False
+                break        
+        if winning_player != 2:
+            return winning_player
+        return
+
+    
+    def check_diagonals(self):
+        """Searches for a full diagonal row. If one is found, the flag self.gameStillGoing flips to False.
+
+        Returns
+        -------
+        winning_player : `int`
+            Symbol of the winner if there is one.
+        """
+        diag1, diag2 = True, True
+        token1, token2 = self.board[0], self.board[self.N-1]
+        for row in range(1,self.N):
+            if token1 != self.board[row*self.N+row]:
+                diag1 = False
+            if token2 != self.board[row*self.N+(self.N-row-1)]:
+                diag2 = False
+            if not diag1 and not diag2:
+                break
+        if diag1 and token1 != 2:
+            self.gameStillGoing = False
+            return token1
+        elif diag2 and token2 != 2:
+            self.gameStillGoing = False
+            return token2
+        return
+    
+    
+    def check_if_tie(self):
+        """Checks whether there is a tie, which means the board is completely full but no one wins. If so, the flag self.gameStillGoing flips to False. """
+        if self.counter is not None:
+            if self.counter.moves == self.N*self.N:
+                self.gameStillGoing = False
+        elif self.bitboard is not None:
+            if self.bitboard.is_full():
+                self.gameStillGoing = False
+        elif 2 not in self.board:
+            self.gameStillGoing = False
+        return
+    
+        
+    def give_reward(self):
+        """Gives rewards at the end of a game."""
+        result = self.winner
+        if result == 0:
+            self.p1.update_policy(1)
+            self.p2.update_policy(0)
+        elif result == 1:
+            self.p1.update_policy(0)
+            self.p2.update_policy(1)
+        else:
+            self.p1.update_policy(0.5)                             
+            self.p2.update_policy(0.5)
+
+            
+    def reset(self):
+        """Resets the game to the beginning."""
+        self.board = [2 for i in range(self.N*self.N)] 
+        if self.bitboard is not None:
+            self.bitboard.reset()
+        if self.counter is not None:
+            self.counter.reset()
+        if self.hashes is not None:
+            self.hashes = [0]*8
+        self.frontier = 0
+        self.frontiers = []
+        self.gameStillGoing = True
+        self.winner = None
+        self.currentPlayer = 0
+        
+    
+    def training(self, rounds=100, progress=None, interval=0.1):
+        """ Handles training of player 1 and player 2 to update their policies.
+
+        Parameters
+        ----------
+        rounds : `int`
+            Number of games in the training.
+
+        progress : `callable`
+            Called as progress(done, rounds) after a game, at most once every interval seconds and after the last game.
+
+        interval : `float`
+            Minimum number of seconds between two calls to progress.
+        """
+        if progress is not None:
+            progress = RateLimited(progress, interval)
+        
+        for i in range(rounds):
+            if self.stats is not None:
+                self.timed_round()
+                start = time.perf_counter()
+                if progress is not None:
+                    progress(i+1, rounds)
+                self.stats.timers["progress"] += time.perf_counter() - start
+                continue
+            while self.gameStillGoing:
+                # Player 1 plays
+                positions = self.available_positions()
+                p1_pick = self.p1.choose_action(positions, self.board, self.currentPlayer, self.hashes) 
+                self.update_board(p1_pick)
+                self.p1.add_state(self.board, self.hashes)
+                # Check whether the game ends here
+                self.check_if_game_over()
+                if not self.gameStillGoing:
+                    self.give_reward()
+                    self.p1.reset()
+                    self.p2.reset()
+                    self.reset()
+                    break
+                else:
+                    # Player 2 plays
+                    positions = self.available_positions()
+                    p2_pick = self.p2.choose_action(positions, self.board, self.currentPlayer, self.hashes)
+                    self.update_board(p2_pick)
+                    self.p2.add_state(self.board, self.hashes)
+                    # Check whether the game ends here
+                    self.check_if_game_over()
+                    if not self.gameStillGoing:
+                        self.give_reward()
+                        self.p1.reset()
+                        self.p2.reset()
+                        self.reset()
+                        break
+            if progress is not None:
+                progress(i+1, rounds)
+                
+                
+    def timed_round(self):
+        """Plays one game of the training like `training` does, timing each phase of each move in self.stats."""
+        stats = self.stats
+        timers = stats.timers
+        clock = time.perf_counter
+        while True:
+            for player in (self.p1, self.p2):
+                start = clock()
+                positions = self.available_positions()
+                chosen = clock()
+                pick = player.choose_action(positions, self.board, self.currentPlayer, self.hashes)
+                played = clock()
+                self.update_board(pick)
+                added = clock()
+                player.add_state(self.board, self.hashes)
+                checked = clock()
+                self.check_if_game_over()
+                end = clock()
+                timers["available_positions"] += chosen - start
+                timers["choose_action"] += played - chosen
+                timers["update_board"] += added - played
+                timers["add_state"] += checked - added
+                timers["check_if_game_over"] += end - checked
+                stats.counters["moves"] += 1
+                if not self.gameStillGoing:
+                    self.give_reward()
+                    self.p1.reset()
+                    self.p2.reset()
+                    self.reset()
+                    timers["give_reward"] += clock() - end
+                    stats.end_round()
+                    return
+        
+                       
+    def computer_move(self):
+        """ Generates an action from p1 (computer) based on its policy.
+        
+        Returns
+        -------
+        p1_pick : `int`
+            Chosen position.
+        """
+        positions = self.available_positions()
+        p1_pick = self.p1.choose_action(positions, self.board, self.currentPlayer, self.hashes)
+        self.p1.add_state(self.board, self.hashes)
+        self.update_board(p1_pick)
+        return p1_pick
+
+
+class Bitboard:
+    
+    def __init__(self, N, k=None):
+        """ Constructor. The board is stored as one integer mask per player, bit i being set when position i is taken.
+    
+        Parameters
+        ----------
+        N : `int`
+            Dimension of board game NxN
+
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        """
+        self.N = N
+        self.full = (1 << N*N) - 1
+        self.lines = line_masks(N, k)
+        self.masks = [0, 0]
+        
+        
+    def place(self, position, symbol):
+        """ Marks a position as taken by a player.
+
+        Parameters
+        ----------
+        position : `int`
+            Selected position in the hashed board as an integer between 0 and N*N.
+
+        symbol : `int`
+            Symbol of the player, 0 or 1.
+        """
+        self.masks[symbol] |= 1 << position
+        
+        
+    def remove(self, position, symbol):
+        """ Frees a position taken by a player.
+
+        Parameters
+        ----------
+        position : `int`
+            Position in the hashed board as an integer between 0 and N*N.
+
+        symbol : `int`
+            Symbol of the player, 0 or 1.
+        """
+        self.masks[symbol] &= ~(1 << position)
+        
+        
+    def empty(self):
+        """Returns the mask of empty positions."""
+        return self.full & ~(self.masks[0] | self.masks[1])
+    
+    
+    def available_positions(self):
+        """Lists empty positions in increasing order by walking the set bits of the empty mask.
+
+        Returns
+        -------
+        positions : `list`
+            It contains current empty position on the board game.
+        """
+        positions = []
+        empty = self.empty()
+        while empty:
+            low = empty & -empty
+            positions.append(low.bit_length() - 1)
+            empty ^= low
+        return positions
+    
+    
+    def winner(self):
+        """Searches for a line fully covered by one player's mask.
+
+        Returns
+        -------
+        winning_player : `int`
+            Symbol of the winner if there is one, None otherwise.
+        """
+        for symbol in (0, 1):
+            mask = self.masks[symbol]
+            for line in self.lines:
+                if mask & line == line:
+                    return symbol
+        return None
+    
+    
+    def is_full(self):
+        """Returns True when no position is left empty."""
+        return self.masks[0] | self.masks[1] == self.full
+    
+    
+    def reset(self):
+        """Clears both masks."""
+        self.masks = [0, 0]
+        
+
+class LineCounter:
+    
+    def __init__(self, N, k=None):
+        """ Constructor. Keeps, for each player, how many positions of every line are taken so that a move only touches the lines going through it.
+        With k less than N, the lines are the windows of k positions, at most 4k of them going through a position
+        whatever the size of the board.
+    
+        Parameters
+        ----------
+        N : `int`
+            Dimension of board game NxN
+
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        """
+        self.N = N
+        self.k = N if k is None else k
+        self.lines_through = cell_lines(N, k)
+        self.reset()
+        
+        
+    def place(self, position, symbol):
+        """ Records a move and checks the lines going through it.
+
+        Parameters
+        ----------
+        position : `int`
+            Selected position in the hashed board as an integer between 0 and N*N.
+
+        symbol : `int`
+            Symbol of the player, 0 or 1.
+        """
+        self.moves += 1
+        counts = self.counts[symbol]
+        for line in self.lines_through[position]:
+            counts[line] += 1
+            if counts[line] == self.k:
+                self.winner = symbol
+        
+        
+    def remove(self, position, symbol):
+        """ Takes back a move. The game can only have been won by the last move, so the winner is cleared.
+
+        Parameters
+        ----------
+        position : `int`
+            Position in the hashed board as an integer between 0 and N*N.
+
+        symbol : `int`
+            Symbol of the player, 0 or 1.
+        """
+        self.moves -= 1
+        counts = self.counts[symbol]
+        for line in self.lines_through[position]:
+            counts[line] -= 1
+        self.winner = None
+        
+        
+    def reset(self):
+        """Clears all counters."""
+        n_lines = len(line_masks(self.N, self.k))
+        self.counts = [[0]*n_lines, [0]*n_lines]
+        self.moves = 0
+        self.winner = None
+
+
+class Human:
+    
+    def __init__(self, name):
+        """ Constructor.
+    
+        Parameters
+        ----------
+        name : `str`
+            Name of human player.
+        """
+        self.name = name
+
+    def choose_action(self, positions, current_board=None, symbol=None, hashes=None):
+        """Chooses an action depending on the available positions.
+    
+        Parameters
+        ----------
+        positions : `list`
+            List of available positions the human play can pick from.
+            
+        current_board, symbol, hashes :
+            Unused, accepted to share the `Computer` interface.
+            
+        Returns
+        -------
+        pick : `int`
+            Chosen position.
+        """
+        while True:
+            pick = input("Choisir une position (1-9) : ")
+            pick = int(pick) - 1
+            if pick in positions:
+                return pick
+                break
+            else:
+                print("Position occupée !")
+
+                
+    def add_state(self, state, hashes=None):
+        pass
+
+    def update_policy(self, reward):
+        pass
+
+    def reset(self):
+        pass
+
+
+class RateLimited:
+    
+    def __init__(self, callback, interval=0.1):
+        """ Constructor. Wraps a progress callback so that it is called at most once every interval seconds,
+        and always for the last step.
+    
+        Parameters
+        ----------
+        callback : `callable`
+            Called as callback(done, total).
+
+        interval : `float`
+            Minimum number of seconds between two calls.
+        """
+        self.callback = callback
+        self.interval = interval
+        self.last = None
+        
+        
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if done == total or self.last is None or now - self.last >= self.interval:
+            self.last = now
+            self.callback(done, total)
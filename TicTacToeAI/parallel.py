@@ -0,0 +1,241 @@
+import multiprocessing
+
+import numpy as np
+
+from .batch import BatchSelfPlay
+from .game import Game, RateLimited
+from .replay import ReplayLearner
+
+
+class ParallelTrainer:
+
+    def __init__(self, p1, p2, N, workers=None, sync_every=1000, batch=None, seed=0, k=None, near=None, replay=None,
+                 replay_thread=False):
+        """ Constructor. Shards the self-play of two computers over worker processes.
+        Each worker trains copies of the computers for a share of sync_every games, then the values they updated
+        are merged back into p1 and p2, averaged over the workers weighted by how many times each worker updated them.
+        The workers receive the tables once when they start, and afterwards only the merged values of each sync,
+        so the tables of p1 and p2 mustn't be changed by anything else until `close` is called.
+
+        Parameters
+        ----------
+        p1 : `Computer`
+            First player.
+
+        p2 : `Computer`
+            Second player.
+
+        N : `int`
+            Dimension of board game NxN
+
+        workers : `int`
+            Number of processes, one per core by default.
+
+        sync_every : `int`
+            Number of games played by all the workers between two merges.
+
+        batch : `int`
+            If given, workers play their games this many at a time with `BatchSelfPlay`.
+
+        seed : `int`
+            Base seed, worker i of sync j is seeded with (seed, j, i).
+
+        k, near :
+            Win length and neighbourhood of the games, see `Game`.
+
+        replay, replay_thread :
+            If replay is given, workers learn their games by batches of this many states, see `train`.
+        """
+        if "lines" in (p1.table, p2.table):
+            raise ValueError("the weights of the lines table can't be merged entry by entry")
+        self.p1 = p1
+        self.p2 = p2
+        self.N = N
+        self.workers = workers or multiprocessing.cpu_count()
+        self.sync_every = sync_every
+        self.batch = batch
+        self.seed = seed
+        self.k = k
+        self.near = near
+        self.replay = replay
+        self.replay_thread = replay_thread
+        self.syncs = 0
+        self.processes = []
+        self.connections = []  # main process end of the pipe of each worker
+        self.merged = ({}, {})  # values of the last merge, which the workers haven't received yet
+
+
+    def merge(self, player, deltas):
+        """Merges the values updated by the workers into a player's table.
+
+        Parameters
+        ----------
+        player : `Computer`
+            Player whose table is updated.
+
+        deltas : `list`
+            One dictionary per worker from key to (value, number of updates).
+
+        Returns
+        -------
+        merged : `dict`
+            New value of each merged key.
+        """
+        totals = {}
+        for delta in deltas:
+            for key, (value, visits) in delta.items():
+                weighted, count = totals.get(key, (0, 0))
+                totals[key] = (weighted + visits * value, count + visits)
+        merged = {key: weighted / count for key, (weighted, count) in totals.items()}
+        for key, value in merged.items():
+            player.states_value[key] = value
+        if player.dirty is not None:
+            player.dirty.update(totals)
+        return merged
+
+
+    def start(self):
+        """Starts the workers, each with its own copy of the computers, unless they are running already."""
+        if self.processes:
+            return
+        for i in range(self.workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_worker, daemon=True,
+                                              args=(worker_connection, self.p1, self.p2, self.N, self.batch, self.k,
+                                                    self.near, self.replay, self.replay_thread))
+            process.start()
+            worker_connection.close()
+            self.processes.append(process)
+            self.connections.append(connection)
+        self.merged = ({}, {})
+
+
+    def close(self):
+        """Stops the workers. The next training starts new ones from the current tables."""
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+
+    def training(self, rounds=100, progress=None, interval=0.1):
+        """ Handles training of player 1 and player 2 over the pool of workers.
+
+        Parameters
+        ----------
+        rounds : `int`
+            Number of games in the training.
+
+        progress : `callable`
+            Called as progress(done, rounds) after a merge, at most once every interval seconds and after the last one.
+
+        interval : `float`
+            Minimum number of seconds between two calls to progress.
+        """
+        if progress is not None:
+            progress = RateLimited(progress, interval)
+        self.start()
+        done = 0
+        while done < rounds:
+            games = min(self.sync_every, rounds - done)
+            shares = [games // self.workers + (i < games % self.workers) for i in range(self.workers)]
+            # every worker gets the values of the last merge, even when it has no game to play
+            for i, (connection, share) in enumerate(zip(self.connections, shares)):
+                connection.send((self.merged, share, (self.seed, self.syncs, i)))
+            results = [connection.recv() for connection in self.connections]
+            for result in results:
+                if isinstance(result, Exception):
+                    self.close()
+                    raise result
+            for player in (self.p1, self.p2):
+                if player.evict is not None:
+                    # a round per sync, for the recency of the merged values
+                    player.states_value.tick()
+            self.merged = (self.merge(self.p1, [deltas[0] for deltas in results]),
+                           self.merge(self.p2, [deltas[1] for deltas in results]))
+            self.syncs += 1
+            done += games
+            if progress is not None:
+                progress(done, rounds)
+        if self.p1.evict is not None or self.p2.evict is not None:
+            # the entries the workers evicted on their own aren't in p1 and p2, so the next training starts new
+            # workers from them, as a run resumed from a checkpoint at this point would
+            self.close()
+
+
+def run_worker(connection, p1, p2, N, batch, k, near, replay, replay_thread):
+    """Runs in a worker process: keeps copies of the computers in sync with the merged values it receives,
+    and trains them on each share of games it is sent, until it receives None.
+
+        Parameters
+        ----------
+        connection : `multiprocessing.connection.Connection`
+            Worker end of the pipe, receiving (merged, rounds, seed) and sending back the deltas of `train_shard`.
+        p1, p2 : `Computer`
+            Copies of the players as the worker starts.
+        N, batch, k, near, replay, replay_thread :
+            Settings of the games, see `train_shard`.
+        """
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        merged, rounds, seed = task
+        try:
+            # the merge overwrites every value the worker updated in the previous share
+            for player, values in zip((p1, p2), merged):
+                for key, value in values.items():
+                    player.states_value[key] = value
+            result = ({}, {})
+            if rounds:
+                result = train_shard(p1, p2, N, rounds, batch, seed, k, near, replay, replay_thread)
+        except Exception as error:
+            result = error
+        connection.send(result)
+    connection.close()
+
+
+def train_shard(p1, p2, N, rounds, batch, seed, k=None, near=None, replay=None, replay_thread=False):
+    """Runs in a worker: trains the copies of the computers it receives and reports what they learnt.
+
+        Parameters
+        ----------
+        p1, p2 : `Computer`
+            Copies of the players, in sync with the main process.
+        N : `int`
+            Dimension of board game NxN
+        rounds : `int`
+            Number of games to play.
+        batch : `int`
+            If given, games are played this many at a time with `BatchSelfPlay`.
+        seed : `tuple`
+            Seed of the worker's random draws, from which each player's stream is spawned.
+        k, near :
+            Win length and neighbourhood of the games, see `Game`.
+        replay, replay_thread :
+            Replay learning of the games, see `train`.
+        Returns
+        -------
+        deltas : `tuple`
+            For each player, a dictionary from each updated key to its new value and its number of updates.
+        """
+    for player, stream in zip((p1, p2), np.random.SeedSequence(seed).spawn(2)):
+        player.reseed(stream)
+    p1.visits, p2.visits = {}, {}
+    p1.dirty, p2.dirty = None, None
+    if batch:
+        game = BatchSelfPlay(p1, p2, N, batch=batch, seed=seed, k=k)
+    else:
+        game = Game(p1, p2, N, bitboard=True, incremental=True, zobrist=p1.keys == "zobrist", k=k, near=near)
+    if replay:
+        for player in (p1, p2):
+            ReplayLearner(player, capacity=max(1 << 16, 2*replay), batch=replay, thread=replay_thread)
+    game.training(rounds)
+    for player in (p1, p2):
+        if player.replay is not None:
+            player.replay.close()
+    # an entry evicted by the worker is worth the default 0
+    return tuple({key: (player.states_value.get(key, 0.0), visits) for key, visits in player.visits.items()} for player in (p1, p2))
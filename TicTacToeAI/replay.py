@@ -0,0 +1,245 @@
+import threading
+
+import numpy as np
+
+from .tables import get_many, set_many
+
+
+class ReplayBuffer:
+
+    def __init__(self, capacity, width):
+        """ Constructor. Ring buffer of the states reached by a player, preallocated as NumPy arrays.
+        Each record holds the keys of a state, and the last record of a game also holds its reward.
+
+        Parameters
+        ----------
+        capacity : `int`
+            Number of records.
+
+        width : `int`
+            Number of keys per state.
+        """
+        self.keys = np.zeros((capacity, width), dtype=np.uint64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.ends = np.zeros(capacity, dtype=bool)  # whether each record is the last of its game
+        self.capacity = capacity
+        self.start = 0
+        self.count = 0
+
+
+    def free(self):
+        """Number of records which can be pushed."""
+        return self.capacity - self.count
+
+
+    def push(self, keys, reward):
+        """ Appends the states of a game, in the order they were reached.
+
+        Parameters
+        ----------
+        keys : `numpy.ndarray`
+            (T, width) keys of the states, T being at most `free()`.
+
+        reward : `float`
+            Reward of the game.
+        """
+        slots = (self.start + self.count + np.arange(len(keys))) % self.capacity
+        self.keys[slots] = keys
+        self.ends[slots] = False
+        self.ends[slots[-1]] = True
+        self.rewards[slots[-1]] = reward
+        self.count += len(keys)
+
+
+    def take(self):
+        """Removes all the records.
+
+        Returns
+        -------
+        keys, rewards, ends : `numpy.ndarray`
+            Copies of the records, oldest first.
+        """
+        slots = (self.start + np.arange(self.count)) % self.capacity
+        records = self.keys[slots], self.rewards[slots], self.ends[slots]
+        self.start = (self.start + self.count) % self.capacity
+        self.count = 0
+        return records
+
+
+class ReplayLearner:
+
+    def __init__(self, player, capacity=1 << 16, batch=8192, thread=False):
+        """ Constructor. Takes the learning out of `Computer.update_policy`: the states of each finished game are
+        pushed into a `ReplayBuffer`, and once batch records are waiting the temporal difference backups of all
+        their games are applied at once, in as many vectorized steps as the longest game has states.
+        The player's `update_policy` pushes into it from now on, and `flush` must be called before its table is
+        read by anything else than the player itself.
+
+        Parameters
+        ----------
+        player : `Computer`
+            Player with Zobrist keys whose games are learnt.
+
+        capacity : `int`
+            Number of records of the buffer.
+
+        batch : `int`
+            Number of records which triggers the backups.
+
+        thread : `bool`
+            If True, the backups run in a background thread while the games go on. The player then reads its
+            table under self.lock, and a game is only pushed once the buffer has room for it.
+        """
+        if player.keys != "zobrist" or player.table == "lines":
+            raise ValueError("replayed backups look keys up in batches, use keys='zobrist' and a 'dict' or 'array' table")
+        if batch > capacity:
+            raise ValueError("batch can't be larger than capacity")
+        self.player = player
+        self.batch = batch
+        self.buffer = ReplayBuffer(capacity, 8 if player.symmetry == "all" else 1)
+        self.lock = threading.Lock()  # held while the learner reads and writes the table
+        self.condition = threading.Condition()  # guards the buffer
+        self.busy = False
+        self.waiting = False  # whether a game waits for room in the buffer
+        self.flushing = False
+        self.stopping = False
+        self.thread = None
+        if thread:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        player.replay = self
+
+
+    def push(self, states, reward):
+        """ Queues the states of a finished game, in the format `Computer.add_state` stores them.
+
+        Parameters
+        ----------
+        states : `list`
+            States of the player during the game.
+
+        reward : `float`
+            Reward received by the player.
+        """
+        if not states:
+            return
+        keys = np.array(states, dtype=np.uint64).reshape(len(states), -1)
+        if len(keys) > self.buffer.capacity:
+            raise ValueError("a game of " + str(len(keys)) + " states doesn't fit in the buffer")
+        if self.thread is None:
+            if self.buffer.free() < len(keys):
+                self.learn()
+            self.buffer.push(keys, reward)
+            if self.buffer.count >= self.batch:
+                self.learn()
+            return
+        with self.condition:
+            while self.buffer.free() < len(keys):
+                self.waiting = True
+                self.condition.notify_all()
+                self.condition.wait()
+            self.waiting = False
+            self.buffer.push(keys, reward)
+            if self.buffer.count >= self.batch:
+                self.condition.notify_all()
+
+
+    def flush(self):
+        """Applies the backups of all the queued games, waiting for the background thread if there is one."""
+        if self.thread is None:
+            self.learn()
+            return
+        with self.condition:
+            self.flushing = True
+            self.condition.notify_all()
+            while self.buffer.count or self.busy:
+                self.condition.wait()
+            self.flushing = False
+
+
+    def close(self):
+        """Flushes the queued games and stops the background thread. The player learns game by game again."""
+        self.flush()
+        if self.thread is not None:
+            with self.condition:
+                self.stopping = True
+                self.condition.notify_all()
+            self.thread.join()
+            self.thread = None
+        self.player.replay = None
+
+
+    def run(self):
+        """Runs in the background thread: applies the backups whenever a batch is waiting or a flush is asked for."""
+        while True:
+            with self.condition:
+                while not (self.stopping or self.buffer.count >= self.batch
+                           or (self.flushing or self.waiting) and self.buffer.count):
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                records = self.buffer.take()
+                self.busy = True
+                self.condition.notify_all()
+            try:
+                self.backup(*records)
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+
+    def learn(self):
+        """Applies the backups of the queued games in the calling thread."""
+        if self.buffer.count:
+            self.backup(*self.buffer.take())
+
+
+    def backup(self, keys, rewards, ends):
+        """ Temporal difference backups of complete games, as `Computer.update_policy` does game after game.
+        Step d updates at once the state d moves before the end of every game, its target being the value the
+        state after it got at step d - 1, or the reward at step 0. A state met in several games at the same step,
+        or symmetric copies of it, gets a single update equal to that many successive backups towards the mean
+        of their targets.
+
+        Parameters
+        ----------
+        keys, rewards, ends : `numpy.ndarray`
+            Records returned by `ReplayBuffer.take`.
+        """
+        player = self.player
+        alpha, gamma = player.alpha, player.gamma
+        # distance of each record to the end of its game
+        last = np.flatnonzero(ends)
+        game = np.searchsorted(last, np.arange(len(ends)))
+        distance = last[game] - np.arange(len(ends))
+        order = np.argsort(distance, kind="stable")
+        bounds = np.searchsorted(distance[order], np.arange(distance.max() + 2))
+        classes = keys.min(axis=1)  # the same for all the symmetric copies of a state
+        new = np.zeros(len(ends))
+        if player.evict is not None:
+            with self.lock:
+                player.states_value.tick(len(last))
+        for d in range(len(bounds) - 1):
+            rows = order[bounds[d]:bounds[d + 1]]
+            targets = gamma * (rewards[rows] if d == 0 else new[rows + 1])
+            unique, first, inverse, counts = np.unique(classes[rows], return_index=True, return_inverse=True,
+                                                       return_counts=True)
+            mean = np.bincount(inverse, weights=targets) / counts
+            keep = (1 - alpha) ** counts
+            with self.lock:
+                values = get_many(player.states_value, keys[rows[first], 0]).astype(np.float64)
+                values = keep * values + (1 - keep) * mean
+                written = keys[rows[first]]
+                set_many(player.states_value, written.ravel(), np.repeat(values, written.shape[1]))
+            new[rows] = values[inverse]
+            if player.visits is not None:
+                # each state counts once for each of its distinct keys
+                copies = np.sort(keys[rows], axis=1)
+                distinct = np.ones(copies.shape, dtype=bool)
+                distinct[:, 1:] = copies[:, 1:] != copies[:, :-1]
+                visited, times = np.unique(copies[distinct], return_counts=True)
+                for key, n in zip(visited.tolist(), times.tolist()):
+                    player.visits[key] = player.visits.get(key, 0) + n
+            if player.dirty is not None:
+                player.dirty.update(written.ravel().tolist())
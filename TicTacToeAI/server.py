@@ -0,0 +1,397 @@
+import http.client
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .computer import Computer
+from .game import Game
+from .tables import POLICY_MAGIC, PolicyFile
+
+
+class PolicyServer:
+
+    def __init__(self, computer, host="127.0.0.1", port=8000, max_batch=64, batch_wait=0.001, cache_size=10000,
+                 latencies=10000):
+        """ Constructor. Serves the greedy moves of a computer over HTTP on a loopback address.
+        POST /move with {"board": [...]} answers {"move": position} for the player whose turn it is,
+        GET /stats answers the counters and latency percentiles of the server.
+        Requests arriving together are evaluated as one batch, and recent answers are kept in an LRU cache.
+
+        Parameters
+        ----------
+        computer : `Computer`
+            Player whose policy is served, its epsilon is ignored.
+
+        host : `str`
+            Address to listen on.
+
+        port : `int`
+            Port to listen on, 0 picks a free one.
+
+        max_batch : `int`
+            Maximum number of boards evaluated at once.
+
+        batch_wait : `float`
+            Seconds a batch waits for more requests after its first one.
+
+        cache_size : `int`
+            Number of boards whose move is cached, 0 disables the cache.
+
+        latencies : `int`
+            Number of recent request latencies the statistics are computed from.
+        """
+        self.computer = computer
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # board tuple to move, least recently used first
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=latencies)
+        self.counters = dict.fromkeys(("requests", "errors", "cache_hits", "batches", "batched_boards"), 0)
+        self.httpd = PolicyHTTPServer((host, port), PolicyRequestHandler)
+        self.httpd.policy_server = self
+        self.batcher = threading.Thread(target=self.run_batches, daemon=True)
+        self.batcher.start()
+
+
+    @property
+    def address(self):
+        """(host, port) the server listens on."""
+        return self.httpd.server_address[:2]
+
+
+    def move(self, board):
+        """Answers a board from the cache, or waits for the batch it is evaluated in. Safe to call from many threads.
+
+        Parameters
+        ----------
+        board : `list`
+            Board, 2 for the empty positions, with at least one of them.
+
+        Returns
+        -------
+        pick : `int`
+            Position picked by the computer.
+        """
+        key = tuple(board)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.counters["cache_hits"] += 1
+                return self.cache[key]
+        request = [list(board), threading.Event(), None]
+        self.requests.put(request)
+        request[1].wait()
+        if isinstance(request[2], Exception):
+            raise request[2]
+        return request[2]
+
+
+    def run_batches(self):
+        """Runs in a background thread: gathers the waiting requests into batches and answers them."""
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.requests.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                moves = self.choose_moves([request[0] for request in batch])
+            except Exception as error:
+                moves = [error] * len(batch)
+            with self.lock:
+                self.counters["batches"] += 1
+                self.counters["batched_boards"] += len(batch)
+                for request, move in zip(batch, moves):
+                    if self.cache_size and not isinstance(move, Exception):
+                        self.cache[tuple(request[0])] = move
+                        if len(self.cache) > self.cache_size:
+                            self.cache.popitem(last=False)
+            for request, move in zip(batch, moves):
+                request[2] = move
+                request[1].set()
+
+
+    def choose_moves(self, boards):
+        """Greedy moves of the computer on several boards, looking all their afterstates up at once.
+        Ties are broken like in `Computer.choose_action`.
+
+        Parameters
+        ----------
+        boards : `list`
+            Boards to play on.
+
+        Returns
+        -------
+        picks : `list`
+            Position picked on each board.
+        """
+        computer = self.computer
+        positions, keys = [], []
+        for board in boards:
+            # player 1 moves when both players have played as many times
+            symbol = 0 if board.count(0) == board.count(1) else 1
+            positions.append([p for p, cell in enumerate(board) if cell == 2])
+            keys.extend(computer.afterstate_keys(positions[-1], board, symbol))
+        values = computer.afterstate_values(keys)
+        picks, start = [], 0
+        for board_positions in positions:
+            picks.append(board_positions[computer.best_index(values[start:start + len(board_positions)])])
+            start += len(board_positions)
+        return picks
+
+
+    def check_board(self, board):
+        """Raises ValueError if board is not a board the computer can play on."""
+        # True and 1.0 compare equal to 1, only plain integers are cells
+        if not isinstance(board, list) or any(type(cell) is not int or cell not in (0, 1, 2) for cell in board):
+            raise ValueError("board must be a list of the integers 0, 1 and 2")
+        # a size of 0 is unknown, as in a policy written without it
+        if self.computer.size and len(board) != self.computer.size:
+            raise ValueError("board must have " + str(self.computer.size) + " positions")
+        if int(len(board) ** 0.5) ** 2 != len(board):
+            raise ValueError("board must be a square")
+        if 2 not in board:
+            raise ValueError("board is full")
+        if board.count(0) - board.count(1) not in (0, 1):
+            raise ValueError("board can't be reached, player 1 plays first")
+
+
+    def record(self, seconds, error=False):
+        """Counts a request and its latency."""
+        with self.lock:
+            self.counters["requests"] += 1
+            self.counters["errors"] += error
+            self.latencies.append(seconds)
+
+
+    def stats(self):
+        """Counters of the server and percentiles of the recent request latencies.
+
+        Returns
+        -------
+        stats : `dict`
+            Counters, mean batch size, and latencies in microseconds.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            latencies = np.array(self.latencies) * 1e6
+        stats = {"counters": counters, "cache_entries": len(self.cache),
+                 "mean_batch": counters["batched_boards"] / counters["batches"] if counters["batches"] else 0.0}
+        if len(latencies):
+            stats["latency_us"] = {"mean": float(latencies.mean()), "p50": float(np.percentile(latencies, 50)),
+                                   "p90": float(np.percentile(latencies, 90)), "p99": float(np.percentile(latencies, 99)),
+                                   "max": float(latencies.max())}
+        return stats
+
+
+    def serve_forever(self):
+        """Handles requests until `shutdown` is called."""
+        self.httpd.serve_forever()
+
+
+    def shutdown(self):
+        """Stops `serve_forever` and closes the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class PolicyHTTPServer(ThreadingHTTPServer):
+    """HTTP server of `PolicyServer`, one thread per connection."""
+
+    daemon_threads = True
+    request_queue_size = 128  # many sessions connect at once, the default backlog of 5 resets them
+
+
+class PolicyRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler of `PolicyServer`, keeping connections alive between requests."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # small answers would otherwise wait for the client's delayed ack
+
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.reply(200, self.server.policy_server.stats())
+        else:
+            self.reply(404, {"error": "unknown path " + self.path})
+
+
+    def do_POST(self):
+        if self.path != "/move":
+            self.reply(404, {"error": "unknown path " + self.path})
+            return
+        server = self.server.policy_server
+        start = time.perf_counter()
+        try:
+            board = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["board"]
+            server.check_board(board)
+            status, answer = 200, {"move": server.move(board)}
+        except (ValueError, KeyError, TypeError) as error:
+            status, answer = 400, {"error": str(error)}
+        server.record(time.perf_counter() - start, error=status != 200)
+        self.reply(status, answer)
+
+
+    def reply(self, status, answer):
+        """Sends a json answer."""
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        """Doesn't log every request."""
+        pass
+
+
+class PolicyClient:
+
+    def __init__(self, host="127.0.0.1", port=8000, timeout=10):
+        """ Constructor. Client of a `PolicyServer`, sending its requests over one kept-alive connection.
+
+        Parameters
+        ----------
+        host : `str`
+            Address of the server.
+
+        port : `int`
+            Port of the server.
+
+        timeout : `float`
+            Seconds to wait for an answer.
+        """
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+    def request(self, method, path, body=None):
+        """Sends a request and decodes the json answer, raising ValueError with the server's message on an error.
+        The body is given as bytes so that http.client sends it along with the headers in a single packet."""
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body=None if body is None else json.dumps(body).encode(),
+                                headers=headers)
+        response = self.connection.getresponse()
+        answer = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(answer["error"])
+        return answer
+
+
+    def move(self, board):
+        """Position the served computer picks on a board."""
+        return self.request("POST", "/move", {"board": list(board)})["move"]
+
+
+    def stats(self):
+        """Statistics of the server, see `PolicyServer.stats`."""
+        return self.request("GET", "/stats")
+
+
+    def close(self):
+        """Closes the connection."""
+        self.connection.close()
+
+
+def load_computer(file, symmetry="all", keys="string"):
+    """Loads a policy file into a greedy computer.
+
+        Parameters
+        ----------
+        file : `str`
+            Json or binary policy file, or the .npz weights of a "lines" table.
+        symmetry, keys :
+            Settings of a json policy, see `Computer`. Those of a binary policy are read from its header.
+        Returns
+        -------
+        computer : `Computer`
+            Computer playing the policy.
+        """
+    with open(file, 'rb') as fp:
+        magic = fp.read(len(POLICY_MAGIC))
+    if magic.startswith(b"PK"):
+        computer = Computer("server", epsilon=0, table="lines")
+        computer.load_policy(file)
+        return computer
+    binary = magic == POLICY_MAGIC
+    if binary:
+        policy = PolicyFile(file)
+        symmetry, keys = policy.symmetry, "zobrist" if policy.keys_scheme == "zobrist" else "string"
+        policy.close()
+    computer = Computer("server", epsilon=0, symmetry=symmetry, keys=keys)
+    computer.load_policy(file)
+    return computer
+
+
+def load_test(host="127.0.0.1", port=8000, sessions=32, games=20, N=3, seed=0):
+    """Plays many games at once against a `PolicyServer`, the server playing first and each session
+    answering with random moves, and measures the throughput and latency seen by the clients.
+
+        Parameters
+        ----------
+        host, port :
+            Address of the server.
+        sessions : `int`
+            Number of concurrent sessions, each in its own thread with its own connection.
+        games : `int`
+            Number of games played by each session.
+        N : `int`
+            Dimension of board game NxN
+        seed : `int`
+            Seed of the moves of the sessions.
+        Returns
+        -------
+        results : `dict`
+            Requests per second, client latencies in microseconds and the statistics of the server.
+        """
+    latencies = [[] for i in range(sessions)]
+    errors = []
+
+    def session(i):
+        rng = np.random.default_rng([seed, i])
+        client = PolicyClient(host, port)
+        try:
+            for j in range(games):
+                game = Game(None, None, N, bitboard=True)
+                while game.gameStillGoing:
+                    if game.currentPlayer == 0:
+                        start = time.perf_counter()
+                        pick = client.move(game.board)
+                        latencies[i].append(time.perf_counter() - start)
+                    else:
+                        pick = int(rng.choice(game.available_positions()))
+                    game.update_board(pick)
+                    game.check_if_game_over()
+        except Exception as error:
+            errors.append(repr(error))
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    client = PolicyClient(host, port)
+    server_stats = client.stats()
+    client.close()
+    timings = np.array([t for session_latencies in latencies for t in session_latencies]) * 1e6
+    results = {"sessions": sessions, "games": sessions * games, "requests": len(timings), "seconds": elapsed,
+               "requests_per_second": len(timings) / elapsed, "errors": errors, "server": server_stats}
+    if len(timings):
+        results["latency_us"] = {"mean": float(timings.mean()), "p50": float(np.percentile(timings, 50)),
+                                 "p90": float(np.percentile(timings, 90)), "p99": float(np.percentile(timings, 99)),
+                                 "max": float(timings.max())}
+    return results
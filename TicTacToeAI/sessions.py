@@ -0,0 +1,252 @@
+import asyncio
+
+import numpy as np
+
+from .boards import zobrist_tables
+from .game import LineCounter
+
+
+class Session:
+
+    # many sessions live at once, slots keep them small
+    __slots__ = ("id", "N", "board", "counter", "hashes", "currentPlayer", "winner", "gameStillGoing", "states")
+
+    def __init__(self, id, N, zobrist=False, k=None):
+        """ Constructor. State of one match between the computer, playing first, and a human.
+        It holds no reference to the players, so that any number of sessions can share them.
+
+        Parameters
+        ----------
+        id : `int`
+            Identifier of the session in its `SessionManager`.
+
+        N : `int`
+            Dimension of board game NxN
+
+        zobrist : `bool`
+            Whether to keep the Zobrist hashes of the board up to date.
+
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        """
+        self.id = id
+        self.N = N
+        self.board = [2]*(N*N)
+        self.counter = LineCounter(N, k)
+        self.hashes = [0]*8 if zobrist else None
+        self.currentPlayer = 0
+        self.winner = None
+        self.gameStillGoing = True
+        self.states = []  # afterstates of the computer, as `Computer.add_state` stores them
+
+
+    def available_positions(self):
+        """Returns the empty positions."""
+        return [p for p, cell in enumerate(self.board) if cell == 2]
+
+
+    def update_board(self, position):
+        """ Plays a move of the current player, then checks whether the game is over and gives the hand to the other.
+
+        Parameters
+        ----------
+        position : `int`
+            Selected position, which must be empty.
+        """
+        symbol = self.currentPlayer
+        self.board[position] = symbol
+        self.counter.place(position, symbol)
+        if self.hashes is not None:
+            tables = zobrist_tables(self.N*self.N)
+            for i in range(8):
+                self.hashes[i] ^= tables[i][position][symbol]
+        if self.counter.winner is not None:
+            self.winner = self.counter.winner
+            self.gameStillGoing = False
+        elif self.counter.moves == self.N*self.N:
+            self.gameStillGoing = False
+        self.currentPlayer = 1 - symbol
+
+
+class SessionManager:
+
+    def __init__(self, policy, N=3, learner=None, learn_batch=256, publish_every=1000, k=None):
+        """ Constructor. Hosts many matches against one computer in a single asyncio loop.
+        The sessions only read the value table of policy, which is treated as an immutable snapshot.
+        When a learner is given, finished games are queued and applied to it in batches by a background task,
+        and every publish_every of them the learner's table is copied into a new snapshot for the sessions.
+
+        Parameters
+        ----------
+        policy : `Computer`
+            Player of every session, usually with epsilon=0. Its table is shared and never written to.
+
+        N : `int`
+            Dimension of board game NxN
+
+        learner : `Computer`
+            Copy of the player with its own writable table, learning from the finished games.
+
+        learn_batch : `int`
+            Maximum number of games applied to the learner before yielding to the sessions.
+
+        publish_every : `int`
+            Number of learnt games between two snapshots, None to never publish them.
+
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        """
+        self.policy = policy
+        self.N = N
+        self.k = k
+        self.learner = learner
+        self.learn_batch = learn_batch
+        self.publish_every = publish_every
+        self.zobrist = "zobrist" in (policy.keys, getattr(learner, "keys", None))
+        self.sessions = {}
+        self.next_id = 0
+        self.results = None  # queue of (states, reward) of the finished games, created by start
+        self.learning = None
+        self.counters = dict.fromkeys(("sessions", "finished", "learned", "published"), 0)
+
+
+    async def start(self):
+        """Starts the learning task, if there is a learner."""
+        if self.learner is not None:
+            self.results = asyncio.Queue()
+            self.learning = asyncio.create_task(self.learn())
+
+
+    async def stop(self):
+        """Waits for the queued games to be learnt and stops the learning task."""
+        if self.learning is not None:
+            await self.results.join()
+            if self.learner.replay is not None:
+                self.learner.replay.flush()
+            self.learning.cancel()
+            self.learning = None
+
+
+    async def new_session(self):
+        """ Opens a session, the computer playing its first move.
+
+        Returns
+        -------
+        session : `Session`
+            New session, it is the human's turn.
+        """
+        session = Session(self.next_id, self.N, zobrist=self.zobrist, k=self.k)
+        self.sessions[session.id] = session
+        self.next_id += 1
+        self.counters["sessions"] += 1
+        self.computer_move(session)
+        return session
+
+
+    async def play(self, id, position):
+        """ Plays a move of the human in a session and the answer of the computer.
+        A finished session is closed and its game queued for the learner.
+
+        Parameters
+        ----------
+        id : `int`
+            Identifier of the session.
+
+        position : `int`
+            Position picked by the human.
+
+        Returns
+        -------
+        session : `Session`
+            The session after both moves.
+        """
+        session = self.sessions.get(id)
+        if session is None:
+            raise ValueError("no session " + str(id) + ", it may be over")
+        if not 0 <= position < self.N*self.N or session.board[position] != 2:
+            raise ValueError("position " + str(position) + " is not available")
+        session.update_board(position)
+        if session.gameStillGoing:
+            self.computer_move(session)
+        if not session.gameStillGoing:
+            await self.finish(session)
+        return session
+
+
+    def computer_move(self, session):
+        """Plays the move of the computer in a session, reading the current snapshot."""
+        positions = session.available_positions()
+        pick = self.policy.choose_action(positions, session.board, session.currentPlayer, session.hashes)
+        session.update_board(pick)
+        if self.learner is not None:
+            session.states.append(self.learner.stored_state(session.board, session.hashes))
+
+
+    async def finish(self, session):
+        """Closes a finished session and queues its game for the learner."""
+        del self.sessions[session.id]
+        self.counters["finished"] += 1
+        if self.learner is not None:
+            reward = {0: 1, 1: 0, None: 0.5}[session.winner]
+            await self.results.put((session.states, reward))
+
+
+    async def learn(self):
+        """Runs as a task: applies the finished games to the learner by batches, as `Game.give_reward` does."""
+        while True:
+            games = [await self.results.get()]
+            while len(games) < self.learn_batch and not self.results.empty():
+                games.append(self.results.get_nowait())
+            for states, reward in games:
+                self.learner.states = states
+                self.learner.update_policy(reward)
+                self.learner.reset()
+                self.results.task_done()
+            before = self.counters["learned"]
+            self.counters["learned"] += len(games)
+            if self.publish_every and self.counters["learned"] // self.publish_every > before // self.publish_every:
+                self.publish()
+            # let the sessions run between two batches
+            await asyncio.sleep(0)
+
+
+    def publish(self):
+        """Replaces the snapshot read by the sessions with a copy of the learner's table."""
+        if self.learner.replay is not None:
+            self.learner.replay.flush()
+        self.policy.states_value = self.learner.states_value.copy()
+        self.counters["published"] += 1
+
+
+async def simulate(manager, sessions=1000, games=1, seed=0):
+    """Plays random humans against a manager, all the sessions being open at the same time.
+
+        Parameters
+        ----------
+        manager : `SessionManager`
+            Manager to load, started.
+        sessions : `int`
+            Number of concurrent humans.
+        games : `int`
+            Number of games played by each human.
+        seed : `int`
+            Seed of the moves of the humans.
+        Returns
+        -------
+        winners : `dict`
+            Number of games won by the computer, by the humans, and tied.
+        """
+    winners = {"computer": 0, "human": 0, "tie": 0}
+
+    async def human(i):
+        rng = np.random.default_rng([seed, i])
+        for j in range(games):
+            session = await manager.new_session()
+            while session.gameStillGoing:
+                # yield to the other sessions as a client waiting for the network would
+                await asyncio.sleep(0)
+                session = await manager.play(session.id, int(rng.choice(session.available_positions())))
+            winners[{0: "computer", 1: "human", None: "tie"}[session.winner]] += 1
+
+    await asyncio.gather(*(human(i) for i in range(sessions)))
+    return winners
@@ -0,0 +1,288 @@
+import functools
+import os
+
+import numpy as np
+
+from .boards import cell_lines, line_masks, symmetries
+
+# flags of the transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class Solver:
+
+    def __init__(self, name, cache=None):
+        """ Constructor. Player which plays perfectly, found by negamax search with alpha-beta pruning.
+        Positions are stored in a transposition table under the key of their canonical symmetric copy,
+        so each symmetry class is solved once, and the table can be saved to disk and reused.
+
+        Player 1 is assumed to move first, so that the number of stones tells who is to move.
+        Scores are given from the point of view of the player to move: 0 for a tie,
+        size + 1 - moves for a win on the given move, its opposite for a loss, so that earlier wins score higher.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of solver player.
+
+        cache : `str`
+            Path of a .npz file holding the transposition table, loaded if it exists and written by `save_cache`.
+        """
+        self.name = name
+        self.cache = cache
+        self.tables = {}  # transposition table of each board size
+        if cache is not None and os.path.exists(cache):
+            self.load_cache(cache)
+
+
+    def choose_action(self, positions, current_board, symbol, hashes=None):
+        """Chooses the best action, the first one in the search order among equally good actions.
+        Moves leading to symmetric boards are only searched once.
+
+        Parameters
+        ----------
+        positions : `list`
+            List of available positions the agent can pick from.
+
+        current_board : `list`
+            List representing the current board
+
+        symbol : `int`
+            Symbol of current player.
+
+        hashes :
+            Unused, accepted to share the `Computer` interface.
+
+        Returns
+        -------
+        pick : `int`
+            Chosen position.
+        """
+        search = Search(self.tables.setdefault(len(current_board), {}), current_board)
+        best, action = None, None
+        for p in search.unique([p for p in search.order if p in positions]):
+            value = search.move_value(p, symbol)
+            if best is None or value > best:
+                best, action = value, p
+        return action
+
+
+    def solve(self, board, symbol):
+        """Computes the score of a board for the player to move.
+
+        Parameters
+        ----------
+        board : `list`
+            List representing the board.
+
+        symbol : `int`
+            Symbol of the player to move.
+
+        Returns
+        -------
+        score : `int`
+            Score of the board with perfect play from both sides.
+        """
+        search = Search(self.tables.setdefault(len(board), {}), board)
+        return search.negamax(symbol, -search.size - 1, search.size + 1)
+
+
+    def add_state(self, state, hashes=None):
+        pass
+
+    def update_policy(self, reward):
+        pass
+
+    def reset(self):
+        pass
+
+
+    def save_cache(self, file=None):
+        """Writes the transposition tables to a .npz file, self.cache by default."""
+        arrays = {}
+        for size, table in self.tables.items():
+            arrays["keys_" + str(size)] = np.fromiter(table.keys(), dtype=np.uint64, count=len(table))
+            arrays["entries_" + str(size)] = np.array(list(table.values()), dtype=np.int8).reshape(len(table), 2)
+        np.savez(file or self.cache, **arrays)
+
+
+    def load_cache(self, file):
+        """Adds the transposition tables of a .npz file written by `save_cache`."""
+        with np.load(file) as arrays:
+            for name in arrays.files:
+                if name.startswith("keys_"):
+                    size = name[len("keys_"):]
+                    entries = [tuple(e) for e in arrays["entries_" + size].tolist()]
+                    self.tables.setdefault(int(size), {}).update(zip(arrays[name].tolist(), entries))
+
+
+class Search:
+
+    def __init__(self, table, board):
+        """ Constructor. Search state of `Solver`: one bit mask per player, the `board_key` of the 8 symmetric
+        copies of the board, updated at each move, and the transposition table of this board size.
+
+        Parameters
+        ----------
+        table : `dict`
+            Transposition table, from canonical key to (score, flag).
+
+        board : `list`
+            List representing the board to search from.
+        """
+        self.table = table
+        self.size = len(board)
+        self.full = (1 << self.size) - 1
+        self.lines, self.order, self.deltas = search_tables(self.size)
+        self.masks = [0, 0]
+        # every symmetric copy of the empty board has the same key
+        self.codes = [(3**self.size - 1)]*8
+        self.moves = 0
+        for p, symbol in enumerate(board):
+            if symbol != 2:
+                self.play(p, symbol)
+
+
+    def play(self, p, symbol):
+        """Puts a stone of a player on position p."""
+        self.masks[symbol] |= 1 << p
+        self.moves += 1
+        deltas = self.deltas[p][symbol]
+        self.codes = [c + d for c, d in zip(self.codes, deltas)]
+
+
+    def undo(self, p, symbol):
+        """Takes back the stone of a player on position p."""
+        self.masks[symbol] &= ~(1 << p)
+        self.moves -= 1
+        deltas = self.deltas[p][symbol]
+        self.codes = [c - d for c, d in zip(self.codes, deltas)]
+
+
+    def unique(self, candidates):
+        """Keeps the first of the candidate positions of each class of moves leading to symmetric boards,
+        the board being left unchanged by the symmetries whose copy has the same key."""
+        codes = self.codes
+        if codes.count(codes[0]) == 1:
+            return candidates
+        perms = [perm for perm, code in zip(symmetries(self.size), codes) if code == codes[0]]
+        unique, seen = [], set()
+        for p in candidates:
+            if p not in seen:
+                unique.append(p)
+                seen.update(perm[p] for perm in perms)
+        return unique
+
+
+    def wins(self, mask, p):
+        """Whether a player's mask holds a full line through p."""
+        for line in self.lines[p]:
+            if mask & line == line:
+                return True
+        return False
+
+
+    def threats(self, symbol, empty):
+        """Empty positions where a player would complete a line."""
+        mask = self.masks[symbol]
+        return [p for p in self.order if empty >> p & 1 and self.wins(mask | 1 << p, p)]
+
+
+    def move_value(self, p, symbol):
+        """Score, for the player to move, of playing position p."""
+        if self.wins(self.masks[symbol] | 1 << p, p):
+            return self.size - self.moves
+        self.play(p, symbol)
+        value = -self.negamax(1 - symbol, -self.size - 1, self.size + 1)
+        self.undo(p, symbol)
+        return value
+
+
+    def negamax(self, symbol, alpha, beta):
+        """Scores the current board for the player to move, within the window (alpha, beta).
+        The board is assumed not to be won already.
+
+        Parameters
+        ----------
+        symbol : `int`
+            Symbol of the player to move.
+
+        alpha, beta : `int`
+            Search window, scores outside of it are only bounds.
+
+        Returns
+        -------
+        score : `int`
+            Score of the board.
+        """
+        if self.moves == self.size:
+            return 0
+        key = min(self.codes)
+        entry = self.table.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+        empty = self.full & ~(self.masks[0] | self.masks[1])
+        # win now if possible, otherwise block the opponent, or lose if it has two ways to win
+        if self.threats(symbol, empty):
+            self.table[key] = (self.size - self.moves, EXACT)
+            return self.size - self.moves
+        candidates = self.threats(1 - symbol, empty)
+        if len(candidates) > 1:
+            self.table[key] = (self.moves + 1 - self.size, EXACT)
+            return self.moves + 1 - self.size
+        if not candidates:
+            candidates = self.unique([p for p in self.order if empty >> p & 1])
+        alpha_orig = alpha
+        best = -self.size - 1
+        for p in candidates:
+            self.play(p, symbol)
+            value = -self.negamax(1 - symbol, -beta, -alpha)
+            self.undo(p, symbol)
+            if value > best:
+                best = value
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        flag = UPPER if best <= alpha_orig else LOWER if best >= beta else EXACT
+        self.table[key] = (best, flag)
+        return best
+
+
+@functools.lru_cache(maxsize=None)
+def search_tables(size):
+    """Precomputes what `Search` needs for a board size.
+
+        Parameters
+        ----------
+        size : `int`
+            Number of positions on the board, N*N.
+        Returns
+        -------
+        lines : `tuple`
+            For each position, the masks of the lines going through it.
+        order : `tuple`
+            Positions sorted by decreasing number of lines through them, the order in which moves are tried.
+        deltas : `tuple`
+            deltas[p][symbol][s], change of the `board_key` of the s-th symmetric copy when symbol is played on p.
+        """
+    N = int(np.sqrt(size))
+    masks = line_masks(N)
+    lines = tuple(tuple(masks[i] for i in through) for through in cell_lines(N))
+    order = tuple(sorted(range(size), key=lambda p: -len(lines[p])))
+    inverses = []
+    for perm in symmetries(size):
+        inverse = [0]*size
+        for i, p in enumerate(perm):
+            inverse[p] = i
+        inverses.append(tuple(inverse))
+    deltas = tuple(tuple(tuple((symbol - 2) * 3**inv[p] for inv in inverses) for symbol in (0, 1)) for p in range(size))
+    return lines, order, deltas
@@ -0,0 +1,94 @@
+import cProfile
+import io
+import pstats
+import time
+
+
+class Stats:
+
+    def __init__(self, every=None, callback=None):
+        """ Constructor. Timers and counters filled by a `Game` or `Computer` given this object as stats,
+        which do no extra work at all when they have none. Players sharing a Stats add up their counters.
+
+        Timers, in seconds : available_positions, choose_action, update_board, add_state, check_if_game_over,
+        give_reward, progress. Counters : rounds, moves, greedy and random picks, hits and misses of the
+        value table during greedy picks, and states inserted into it.
+
+        Parameters
+        ----------
+        every : `int`
+            If given, a snapshot is taken every this many rounds, kept in self.history.
+
+        callback : `callable`
+            Called with each snapshot.
+        """
+        self.every = every
+        self.callback = callback
+        self.history = []
+        self.reset()
+
+
+    def reset(self):
+        """Sets all timers and counters back to zero."""
+        self.timers = dict.fromkeys(("available_positions", "choose_action", "update_board", "add_state",
+                                     "check_if_game_over", "give_reward", "progress"), 0.0)
+        self.counters = dict.fromkeys(("rounds", "moves", "greedy", "random", "hits", "misses", "inserted"), 0)
+        self.start = time.perf_counter()
+
+
+    def end_round(self):
+        """Counts a finished game, and takes a snapshot if it is time to."""
+        self.counters["rounds"] += 1
+        if self.every and self.counters["rounds"] % self.every == 0:
+            snapshot = self.snapshot()
+            self.history.append(snapshot)
+            if self.callback is not None:
+                self.callback(snapshot)
+
+
+    def snapshot(self):
+        """Copies the current timers and counters.
+
+        Returns
+        -------
+        snapshot : `dict`
+            Counters, timers, wall time since the last reset and games per second.
+        """
+        elapsed = time.perf_counter() - self.start
+        return {"elapsed": elapsed, "games_per_second": self.counters["rounds"] / elapsed if elapsed else 0.0,
+                "counters": dict(self.counters), "timers": dict(self.timers)}
+
+
+def profile_training(game, rounds, file=None, sort="cumulative", limit=30, **options):
+    """Runs a training under cProfile.
+
+        Parameters
+        ----------
+        game : `Game`, `BatchSelfPlay` or `ParallelTrainer`
+            Trainer to profile.
+        rounds : `int`
+            Number of games in the training.
+        file : `str`
+            If given, the raw profile is dumped there, to be read with pstats or snakeviz.
+        sort : `str`
+            Sort key of the report.
+        limit : `int`
+            Number of functions in the report.
+        options :
+            Other arguments of the training method.
+        Returns
+        -------
+        report : `str`
+            Most expensive functions, as printed by pstats.
+        """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        game.training(rounds, **options)
+    finally:
+        profiler.disable()
+    if file is not None:
+        profiler.dump_stats(file)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
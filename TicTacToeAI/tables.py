@@ -0,0 +1,622 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .boards import board_key, key_board, string_to_list
+
+# binary policy files: magic, version, N, key scheme, symmetry, alpha, gamma, number of entries
+POLICY_MAGIC = b"TTTPOLCY"
+POLICY_VERSION = 1
+POLICY_HEADER = struct.Struct("<8sIIIIddQ")
+POLICY_KEYS = ("board", "zobrist")
+POLICY_SYMMETRIES = ("all", "canonical")
+
+
+class ValueTable:
+    
+    # Fibonacci hashing multiplier, spreads integer keys over the slots
+    MULTIPLIER = 0x9E3779B97F4A7C15
+    # below this many keys, probing them one by one is faster than the vectorized probes of get_many
+    VECTOR_MIN = 32
+    EVICTIONS = ("lfu", "lru", "near")
+    
+    def __init__(self, capacity=1024, max_load=0.5, max_bytes=None, evict=None, evict_fraction=0.1):
+        """ Constructor. Value function stored as open addressing arrays of 64-bit keys and float32 values,
+        with linear probing. It behaves like a dictionary of integer keys, 0 being reserved for empty slots.
+        With an eviction policy, each entry also keeps how many times it was updated and the round it was last
+        updated in, and instead of growing beyond max_bytes the table evicts its least useful entries,
+        which read as the default value again.
+    
+        Parameters
+        ----------
+        capacity : `int`
+            Number of entries to make room for, rounded to a power of two.
+        max_load : `float`
+            Load factor above which the arrays are doubled.
+        max_bytes : `int`
+            Memory budget of the arrays. Growing beyond it raises a MemoryError, unless evict is given.
+        evict : `str`
+            Entries evicted first when the table is full: "lfu" the least updated ones, "lru" the ones updated
+            the longest ago, "near" the ones whose value is the closest to the default 0. The entries updated
+            in the current round, see `tick`, are evicted last.
+        evict_fraction : `float`
+            Fraction of the entries evicted at once, so that evictions are rare.
+        """
+        if evict is not None:
+            if evict not in self.EVICTIONS:
+                raise ValueError("evict must be 'lfu', 'lru' or 'near', got " + repr(evict))
+            if max_bytes is None:
+                raise ValueError("evicting entries needs a budget, give max_bytes")
+        self.max_load = max_load
+        self.max_bytes = max_bytes
+        self.evict = evict
+        self.evict_fraction = evict_fraction
+        self.slot_bytes = 12 if evict is None else 20
+        self.round = 0
+        self.evicted = 0  # entries evicted since creation
+        self.dropped = None  # set to a set to collect the evicted keys
+        self.size = 0
+        self.max_entries = None
+        if evict is not None:
+            max_slots = 8
+            while 2 * max_slots * self.slot_bytes <= max_bytes:
+                max_slots *= 2
+            self.max_entries = int(max_load * max_slots)
+            capacity = min(capacity, self.max_entries)
+        slots = 8
+        while slots * max_load < capacity:
+            slots *= 2
+        self._allocate(slots)
+        
+        
+    def _allocate(self, slots):
+        """Replaces the arrays by empty ones with the given number of slots."""
+        if self.max_bytes is not None and slots * self.slot_bytes > self.max_bytes:
+            raise MemoryError("a value table of " + str(slots) + " slots exceeds the budget of " + str(self.max_bytes) + " bytes")
+        self._keys = np.zeros(slots, dtype=np.uint64)
+        self._values = np.zeros(slots, dtype=np.float32)
+        # updates and round of the last update of each entry, only kept to choose the entries to evict
+        self._visits = np.zeros(slots, dtype=np.uint32) if self.evict is not None else None
+        self._touched = np.zeros(slots, dtype=np.uint32) if self.evict is not None else None
+        self._mask = slots - 1
+        self._shift = 64 - (slots.bit_length() - 1)
+        
+        
+    def _slot(self, key):
+        """Probes for the slot holding a key, or for the empty slot where it would go."""
+        if key == 0:
+            raise KeyError("0 is reserved for empty slots")
+        slot = ((key * self.MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+        keys = self._keys
+        while True:
+            k = keys[slot]
+            if k == key or k == 0:
+                return slot
+            slot = (slot + 1) & self._mask
+            
+            
+    def _place(self, keys, values, visits=None, touched=None):
+        """Inserts arrays of distinct keys which are not in the table yet, all probes advancing together.
+        visits and touched are the counters of the keys, if the table keeps them."""
+        slots = (keys * np.uint64(self.MULTIPLIER)) >> np.uint64(self._shift)
+        while len(keys):
+            free = np.flatnonzero(self._keys[slots] == 0)
+            # the first key claiming a free slot gets it, the others keep probing
+            claimed, first = np.unique(slots[free], return_index=True)
+            won = free[first]
+            self._keys[claimed] = keys[won]
+            self._values[claimed] = values[won]
+            if self._visits is not None:
+                self._visits[claimed] = visits[won]
+                self._touched[claimed] = touched[won]
+            lost = np.ones(len(keys), dtype=bool)
+            lost[won] = False
+            keys, values, slots = keys[lost], values[lost], (slots[lost] + np.uint64(1)) & np.uint64(self._mask)
+            if self._visits is not None:
+                visits, touched = visits[lost], touched[lost]
+            
+            
+    def _lookup(self, keys):
+        """Vectorized `_slot`: probes for an array of keys at once.
+        
+        Returns
+        -------
+        slots : `numpy.ndarray`
+            Slot holding each key, or the empty slot where it would go.
+        found : `numpy.ndarray`
+            Whether each key is in the table.
+        """
+        if np.any(keys == 0):
+            raise KeyError("0 is reserved for empty slots")
+        slots = (keys * np.uint64(self.MULTIPLIER)) >> np.uint64(self._shift)
+        found = np.zeros(len(keys), dtype=bool)
+        pending = np.arange(len(keys))
+        while len(pending):
+            stored = self._keys[slots[pending]]
+            hit = stored == keys[pending]
+            found[pending[hit]] = True
+            pending = pending[~hit & (stored != 0)]
+            slots[pending] = (slots[pending] + np.uint64(1)) & np.uint64(self._mask)
+        return slots, found
+    
+    
+    def _grow(self, size=None):
+        """Doubles the arrays, until they can hold size entries, and reinserts every entry."""
+        size = self.size + 1 if size is None else size
+        slots = 2 * len(self._keys)
+        while size > self.max_load * slots:
+            slots *= 2
+        self._rebuild(slots, self._keys != 0)
+        
+        
+    def _rebuild(self, slots, keep):
+        """Reallocates the arrays with the given number of slots and reinserts the entries of the slots in keep."""
+        keys, values = self._keys[keep], self._values[keep]
+        visits, touched = (self._visits[keep], self._touched[keep]) if self._visits is not None else (None, None)
+        self._allocate(slots)
+        self._place(keys, values, visits, touched)
+        self.size = len(keys)
+        
+        
+    def _make_room(self, count, protect=None):
+        """Evicts entries so that count new ones fit under the budget, and a fraction more so that the next
+        insertions don't evict again right away. Entries updated in the current round are only evicted when the
+        others aren't enough, and the slots in protect, which are about to be updated, last of all."""
+        if self.max_entries is None or self.size + count <= self.max_entries:
+            return
+        used = np.flatnonzero(self._keys)
+        needed = self.size + count - self.max_entries
+        if self.evict == "lfu":
+            # the least recently updated first among the ones updated as many times
+            scores = self._visits[used].astype(np.float64) * 2.0**32 + self._touched[used]
+        elif self.evict == "lru":
+            scores = self._touched[used].astype(np.float64)
+        else:
+            scores = np.abs(self._values[used]).astype(np.float64)
+        # the entries of the current round go last: the fraction evicted ahead of time is only taken from them
+        # when the others can't even make the room needed
+        rank = (self._touched[used] == self.round).astype(np.int8)
+        if protect is not None:
+            rank[np.isin(used, protect)] = 2
+        others = int((rank == 0).sum())
+        victims = needed + int(self.evict_fraction * self.max_entries)
+        victims = min(victims, others) if needed <= others else min(victims, int((rank < 2).sum()))
+        # ties are broken by key, so that the entries evicted don't depend on their slots, e.g. after a resume
+        order = np.lexsort((self._keys[used], scores, rank))[:victims]
+        keep = np.zeros(len(self._keys), dtype=bool)
+        keep[used] = True
+        evicted = used[order]
+        keep[evicted] = False
+        if self.dropped is not None:
+            self.dropped.update(self._keys[evicted].tolist())
+        self._rebuild(len(self._keys), keep)
+        self.evicted += victims
+        
+        
+    def tick(self, rounds=1):
+        """Starts a new round, e.g. a game, for the recency of the updates."""
+        self.round += rounds
+        
+        
+    def get_many(self, keys, default=0.0):
+        """Vectorized `get`.
+        
+        Parameters
+        ----------
+        keys : `numpy.ndarray`
+            Array of uint64 keys.
+        default : `float`
+            Value of the keys which are not in the table.
+            
+        Returns
+        -------
+        values : `numpy.ndarray`
+            float32 value of each key.
+        """
+        if len(keys) < self.VECTOR_MIN:
+            return np.array([self.get(key, default) for key in np.asarray(keys, dtype=np.uint64).tolist()],
+                            dtype=np.float32)
+        slots, found = self._lookup(keys)
+        values = np.full(len(keys), default, dtype=np.float32)
+        values[found] = self._values[slots[found]]
+        return values
+    
+    
+    def set_many(self, keys, values):
+        """Vectorized `__setitem__`. When a key is repeated, its last value is kept.
+        With a budget, more keys than it holds are written in chunks, evicting between them.
+        
+        Parameters
+        ----------
+        keys : `numpy.ndarray`
+            Array of uint64 keys.
+        values : `numpy.ndarray`
+            Array of values.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        values = np.asarray(values, dtype=np.float32)
+        if self.max_entries is not None and len(keys) > self.max_entries:
+            for start in range(0, len(keys), self.max_entries):
+                self.set_many(keys[start:start + self.max_entries], values[start:start + self.max_entries])
+            return
+        slots, found = self._lookup(keys)
+        if self.max_entries is not None and self.size + len(keys) - found.sum() > self.max_entries:
+            # evicting moves the entries around, probe again
+            self._make_room(len(np.unique(keys[~found])), slots[found])
+            slots, found = self._lookup(keys)
+        self._values[slots[found]] = values[found]
+        if self._visits is not None:
+            np.add.at(self._visits, slots[found], 1)
+            self._touched[slots[found]] = self.round
+        # np.unique keeps the first occurrence, look from the end to keep the last one
+        new_keys, last = np.unique(keys[~found][::-1], return_index=True)
+        if len(new_keys):
+            if self.size + len(new_keys) > self.max_load * len(self._keys):
+                self._grow(self.size + len(new_keys))
+            visits = touched = None
+            if self._visits is not None:
+                visits = np.ones(len(new_keys), dtype=np.uint32)
+                touched = np.full(len(new_keys), self.round, dtype=np.uint32)
+            self._place(new_keys, values[~found][::-1][last], visits, touched)
+            self.size += len(new_keys)
+        
+        
+    def get(self, key, default=None):
+        """Returns the value of a key, or default if it is not in the table."""
+        slot = self._slot(key)
+        if self._keys[slot] == 0:
+            return default
+        return float(self._values[slot])
+    
+    
+    def __getitem__(self, key):
+        slot = self._slot(key)
+        if self._keys[slot] == 0:
+            raise KeyError(key)
+        return float(self._values[slot])
+    
+    
+    def __setitem__(self, key, value):
+        slot = self._slot(key)
+        if self._keys[slot] == 0:
+            if self.max_entries is not None and self.size + 1 > self.max_entries:
+                self._make_room(1)
+                slot = self._slot(key)
+            if self.size + 1 > self.max_load * len(self._keys):
+                self._grow()
+                slot = self._slot(key)
+            self._keys[slot] = key
+            self.size += 1
+        elif self._visits is not None:
+            # inserting a key doesn't count as an update, so that the insert and the first update count once
+            self._visits[slot] += 1
+        if self._visits is not None:
+            self._touched[slot] = self.round
+        self._values[slot] = value
+        
+        
+    def entry(self, key):
+        """Returns the value of a key with its number of updates and round of last update, or None if it is
+        not in the table. The counters are None unless the table evicts."""
+        slot = self._slot(key)
+        if self._keys[slot] == 0:
+            return None
+        if self._visits is None:
+            return float(self._values[slot]), None, None
+        return float(self._values[slot]), int(self._visits[slot]), int(self._touched[slot])
+    
+    
+    def restore(self, key, value, visits, touched):
+        """Sets a key to an `entry`, counters included, as when resuming from a checkpoint."""
+        self[key] = value
+        if self._visits is not None and visits is not None:
+            slot = self._slot(key)
+            self._visits[slot] = visits
+            self._touched[slot] = touched
+    
+    
+    def __contains__(self, key):
+        return self._keys[self._slot(key)] != 0
+    
+    
+    def __len__(self):
+        return self.size
+    
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    
+    def keys(self):
+        """Returns the keys as a list of integers."""
+        return self._keys[self._keys != 0].tolist()
+    
+    
+    def values(self):
+        """Returns the values as a list of floats."""
+        return self._values[self._keys != 0].tolist()
+    
+    
+    def items(self):
+        """Returns the (key, value) pairs as a list."""
+        used = self._keys != 0
+        return list(zip(self._keys[used].tolist(), self._values[used].tolist()))
+    
+    
+    def copy(self):
+        """Returns an independent table with the same entries, like dict.copy."""
+        table = ValueTable.__new__(ValueTable)
+        table.__dict__.update(self.__dict__)
+        table._keys = self._keys.copy()
+        table._values = self._values.copy()
+        table.dropped = None
+        if self._visits is not None:
+            table._visits = self._visits.copy()
+            table._touched = self._touched.copy()
+        return table
+    
+    
+    def update(self, other):
+        """Inserts or overwrites every entry of a dictionary-like object."""
+        keys = np.fromiter(other.keys(), dtype=np.uint64, count=len(other))
+        values = np.fromiter(other.values(), dtype=np.float32, count=len(other))
+        self.set_many(keys, values)
+            
+            
+    @property
+    def nbytes(self):
+        """Memory used by the arrays, in bytes."""
+        return len(self._keys) * self.slot_bytes
+    
+    
+    @property
+    def load_factor(self):
+        """Fraction of the slots in use."""
+        return self.size / len(self._keys)
+        
+
+class PolicyFile:
+    
+    def __init__(self, file):
+        """ Constructor. Opens a binary policy written by `write_policy` through mmap, without reading it:
+        lookups binary search the sorted keys and only touch the pages they need. The table is read-only.
+    
+        Parameters
+        ----------
+        file : `str`
+            Path of the binary policy file.
+        """
+        self.file = file
+        self._fp = open(file, 'rb')
+        self._mmap = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, N, keys, symmetry, alpha, gamma, count = POLICY_HEADER.unpack_from(self._mmap)
+        if magic != POLICY_MAGIC:
+            self.close()
+            raise ValueError(file + " is not a binary policy file")
+        if version != POLICY_VERSION:
+            self.close()
+            raise ValueError(file + " has version " + str(version) + ", only version " + str(POLICY_VERSION) + " is supported")
+        self.N = N
+        self.keys_scheme = POLICY_KEYS[keys]
+        self.symmetry = POLICY_SYMMETRIES[symmetry]
+        self.alpha = alpha
+        self.gamma = gamma
+        self.keys_array = np.frombuffer(self._mmap, dtype='<u8', count=count, offset=POLICY_HEADER.size)
+        self.values_array = np.frombuffer(self._mmap, dtype='<f4', count=count, offset=POLICY_HEADER.size + 8*count)
+        
+        
+    def __reduce__(self):
+        """Pickles as the path of the file, so that a process receiving it maps the same pages instead of a copy."""
+        return (PolicyFile, (self.file,))
+        
+        
+    def _int_key(self, key):
+        """Board strings are stored under their base 3 `board_key`."""
+        if isinstance(key, str):
+            return board_key(string_to_list(key))
+        return key
+    
+    
+    def _str_key(self, key):
+        """Inverse of `_int_key`."""
+        if self.keys_scheme == "board":
+            return str(key_board(key, self.N*self.N))
+        return key
+    
+    
+    def get(self, key, default=None):
+        """Returns the value of a key, or default if it is not in the file."""
+        key = self._int_key(key)
+        i = np.searchsorted(self.keys_array, key)
+        if i < len(self.keys_array) and self.keys_array[i] == key:
+            return float(self.values_array[i])
+        return default
+    
+    
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    
+    def __contains__(self, key):
+        return self.get(key) is not None
+    
+    
+    def __len__(self):
+        return len(self.keys_array)
+    
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    
+    def get_many(self, keys, default=0.0):
+        """Vectorized `get` on an array of uint64 keys, returns a float32 array."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        i = np.minimum(np.searchsorted(self.keys_array, keys), max(len(self.keys_array) - 1, 0))
+        values = np.full(len(keys), default, dtype=np.float32)
+        if len(self.keys_array):
+            found = self.keys_array[i] == keys
+            values[found] = self.values_array[i[found]]
+        return values
+    
+    
+    def keys(self):
+        """Returns the keys, as board strings for the "board" key scheme."""
+        return [self._str_key(k) for k in self.keys_array.tolist()]
+    
+    
+    def values(self):
+        """Returns the values as a list of floats."""
+        return self.values_array.tolist()
+    
+    
+    def items(self):
+        """Returns the (key, value) pairs as a list."""
+        return list(zip(self.keys(), self.values()))
+    
+    
+    def close(self):
+        """Unmaps the file."""
+        self.keys_array = self.values_array = None
+        self._mmap.close()
+        self._fp.close()
+        
+
+def get_many(states_value, keys, default=0.0):
+    """Looks up an array of integer keys in any value table, with a single vectorized call when the table has one.
+        
+        Parameters
+        ----------
+        states_value : `dict`, `ValueTable` or `PolicyFile`
+            Value function.
+        keys : `numpy.ndarray`
+            Array of uint64 keys.
+        default : `float`
+            Value of the keys which are not in the table.
+        Returns
+        -------
+        values : `numpy.ndarray`
+            Value of each key.
+        """
+    if hasattr(states_value, "get_many"):
+        return states_value.get_many(keys, default)
+    return np.array([states_value.get(k, default) for k in keys.tolist()], dtype=np.float32)
+
+def set_many(states_value, keys, values):
+    """Writes arrays of integer keys and values into any writable value table, with a single vectorized call when
+    the table has one. When a key is repeated, its last value is kept.
+        
+        Parameters
+        ----------
+        states_value : `dict` or `ValueTable`
+            Value function.
+        keys : `numpy.ndarray`
+            Array of uint64 keys.
+        values : `numpy.ndarray`
+            Array of values.
+        """
+    if hasattr(states_value, "set_many"):
+        states_value.set_many(keys, values)
+    else:
+        states_value.update(zip(keys.tolist(), values.tolist()))
+
+def write_policy(file, states_value, N, alpha, gamma, keys="string", symmetry="all"):
+    """Writes a value function as a binary policy file: a header followed by the sorted uint64 keys
+    and their float32 values, so that `PolicyFile` can binary search it in place.
+        
+        Parameters
+        ----------
+        file : `str`
+            Path of the binary policy file.
+        states_value : `dict`
+            Value function, keyed by board strings or Zobrist hashes.
+        N : `int`
+            Dimension of board game NxN
+        alpha, gamma : `float`
+            Hyperparameters of the computer, recorded in the header.
+        keys : `str`
+            "string" or "zobrist", as in `Computer`. Board strings are stored as their base 3 `board_key`.
+        symmetry : `str`
+            "all" or "canonical", as in `Computer`.
+        """
+    if not N:
+        # a header without N would make readers expect boards of 0 positions
+        raise ValueError("N is needed to write a binary policy, got " + repr(N))
+    if keys == "string":
+        if 3**(N*N) > 2**64:
+            raise ValueError("boards of size " + str(N) + "x" + str(N) + " don't fit in 64-bit keys, use zobrist keys")
+        items = [(board_key(string_to_list(k)), v) for k, v in states_value.items()]
+    else:
+        items = list(states_value.items())
+    key_array = np.fromiter((k for k, v in items), dtype=np.uint64, count=len(items))
+    value_array = np.fromiter((v for k, v in items), dtype=np.float32, count=len(items))
+    order = np.argsort(key_array)
+    scheme = POLICY_KEYS.index("zobrist" if keys == "zobrist" else "board")
+    with open(file, 'wb') as fp:
+        fp.write(POLICY_HEADER.pack(POLICY_MAGIC, POLICY_VERSION, N, scheme, POLICY_SYMMETRIES.index(symmetry), alpha, gamma, len(items)))
+        fp.write(key_array[order].astype('<u8').tobytes())
+        fp.write(value_array[order].astype('<f4').tobytes())
+
+
+def publish_policy(states_value, N, alpha, gamma, keys="string", symmetry="all", name=None):
+    """Writes a value function as a binary policy in shared memory, /dev/shm when the system has it,
+    for any number of processes to map it with `PolicyFile` at the cost of a single copy.
+    The file appears once complete. Remove it with os.remove when no new process needs it,
+    the ones which mapped it keep their mapping.
+        
+        Parameters
+        ----------
+        states_value : `dict`, `ValueTable` or `PolicyFile`
+            Value function.
+        N, alpha, gamma, keys, symmetry :
+            See `write_policy`.
+        name : `str`
+            Name of the file, a unique one by default.
+        Returns
+        -------
+        file : `str`
+            Path of the published policy.
+        """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    if name is None:
+        fd, file = tempfile.mkstemp(prefix="tictactoe-", suffix=".bin", dir=directory)
+        os.close(fd)
+    else:
+        file = os.path.join(directory, name)
+    write_policy(file + ".tmp", states_value, N, alpha, gamma, keys, symmetry)
+    os.replace(file + ".tmp", file)
+    return file
+
+
+def convert_policy(json_file, binary_file, N=None, alpha=0.2, gamma=0.9, keys="string", symmetry="all"):
+    """Converts a policy saved by `Computer.save_policy` as json into the binary format.
+        
+        Parameters
+        ----------
+        json_file : `str`
+            Path of the json policy.
+        binary_file : `str`
+            Path of the binary policy to write.
+        N : `int`
+            Dimension of board game NxN, guessed from the keys when they are board strings.
+        alpha, gamma : `float`
+            Hyperparameters the policy was trained with.
+        keys, symmetry : `str`
+            Settings of the computer which saved the policy.
+        """
+    with open(json_file, 'r') as fp:
+        states_value = json.load(fp)
+    if keys == "zobrist":
+        states_value = {int(k): v for k, v in states_value.items()}
+    elif N is None and states_value:
+        N = int(np.sqrt(len(string_to_list(next(iter(states_value))))))
+    if N is None:
+        raise ValueError("N is needed to convert a policy with zobrist keys")
+    write_policy(binary_file, states_value, N, alpha, gamma, keys, symmetry)
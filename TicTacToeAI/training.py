@@ -0,0 +1,165 @@
+import os
+import sys
+
+import numpy as np
+
+from .batch import BatchSelfPlay
+from .checkpoint import Checkpointer
+from .computer import Computer
+from .game import Game
+from .parallel import ParallelTrainer
+from .replay import ReplayLearner
+from .stats import profile_training
+
+
+def train(rounds, N=3, k=None, near=None, alpha=0.2, gamma=0.9, epsilon=0.3, symmetry="all", keys="string", table="dict",
+          moves="all", window=None, max_bytes=None, evict=None, batch=None, workers=None, sync_every=1000, replay=None,
+          replay_thread=False, stats=None, profile=None, checkpoint=None, checkpoint_every=1000, seed=None, progress=None, interval=0.1):
+    """Trains two computers against each other without any graphical interface.
+        
+        Parameters
+        ----------
+        rounds : `int`
+            Number of games in the training.
+        N : `int`
+            Dimension of board game NxN
+        k : `int`
+            Number of aligned positions which wins, N by default.
+        near : `int`
+            If given, moves are only played near the played positions, see `Game`. Ignored by `BatchSelfPlay`.
+        alpha, gamma, epsilon, symmetry, keys, table, moves, window, max_bytes, evict :
+            Settings of both computers, see `Computer`. The second one always uses the default exploration rate.
+            max_bytes must hold the entries a computer updates in one game.
+        batch : `int`
+            If given, games are played this many at a time by `BatchSelfPlay`, which needs zobrist keys.
+        workers : `int`
+            If given, games are shared between this many processes by `ParallelTrainer`.
+        sync_every : `int`
+            Number of games between two merges of the workers' tables.
+        replay : `int`
+            If given, each computer learns its games by batches of this many states with a `ReplayLearner`,
+            which needs zobrist keys.
+        replay_thread : `bool`
+            Whether the replay learners run in background threads.
+        stats : `Stats`
+            If given, the game and both computers are instrumented with it, for sequential training only.
+        profile : `str`
+            If given, the training runs under cProfile and the profile is dumped to this file.
+        checkpoint : `str`
+            If given, the training resumes from the checkpoints in this directory, if any, and saves new ones there.
+            rounds is then the total number of games, including the ones played before resuming.
+        checkpoint_every : `int`
+            Number of games between two checkpoints.
+        seed : `int`
+            Seed from which the streams of the computers and of the trainer are spawned, so that a training can be
+            repeated exactly. Parallel training is repeatable whatever the timing of the workers.
+        progress : `callable`
+            Called as progress(done, rounds), at most once every interval seconds.
+        interval : `float`
+            Minimum number of seconds between two calls to progress.
+        Returns
+        -------
+        p1, p2 : `Computer`
+            The trained computers, named "p1" and "p2".
+        """
+    if workers or batch:
+        stats = None
+    seeds = np.random.SeedSequence(seed).spawn(3)
+    p1 = Computer("p1", alpha=alpha, gamma=gamma, epsilon=epsilon, symmetry=symmetry, keys=keys, table=table,
+                  moves=moves, window=window, max_bytes=max_bytes, evict=evict, seed=seeds[0], stats=stats)
+    p2 = Computer("p2", alpha=alpha, gamma=gamma, symmetry=symmetry, keys=keys, table=table, moves=moves, window=window,
+                  max_bytes=max_bytes, evict=evict, seed=seeds[1], stats=stats)
+    if evict is not None:
+        # a game updates each of the states of a player, with all its symmetric copies
+        entries = (N*N + 1) // 2 * (8 if symmetry == "all" else 1)
+        if p1.states_value.max_entries < entries:
+            raise ValueError("max_bytes=" + str(max_bytes) + " holds " + str(p1.states_value.max_entries)
+                             + " entries, fewer than the " + str(entries) + " a game can update")
+    if workers:
+        game = trainer = ParallelTrainer(p1, p2, N, workers=workers, sync_every=sync_every, batch=batch, k=k,
+                                         near=near, replay=replay, replay_thread=replay_thread,
+                                         seed=int(seeds[2].generate_state(1)[0]))
+    elif batch:
+        game = BatchSelfPlay(p1, p2, N, batch=batch, seed=seeds[2], k=k)
+    else:
+        game = Game(p1, p2, N, bitboard=True, incremental=True, zobrist=keys == "zobrist", stats=stats,
+                    k=k, near=near)
+    if replay and not workers:
+        for player in (p1, p2):
+            ReplayLearner(player, capacity=max(1 << 16, 2*replay), batch=replay, thread=replay_thread)
+    if checkpoint:
+        game = Checkpointer(checkpoint, game, every=checkpoint_every)
+        game.resume()
+    if profile:
+        profile_training(game, rounds, file=profile, progress=progress, interval=interval)
+    else:
+        game.training(rounds, progress=progress, interval=interval)
+    for player in (p1, p2):
+        if player.replay is not None:
+            player.replay.close()
+    if workers:
+        trainer.close()
+    return p1, p2
+
+def print_progress(done, total):
+    """Progress callback writing a counter on stderr."""
+    sys.stderr.write("\rtraining " + str(done) + "/" + str(total))
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def policy_path(N=3, rounds=10000, alpha=0.2, gamma=0.9, epsilon=0.3, symmetry="all", keys="string", k=None, near=None,
+                directory="policies"):
+    """Path under which the binary policy of player 1 trained with these settings is cached.
+
+        Parameters
+        ----------
+        N, rounds, alpha, gamma, epsilon, symmetry, keys, k, near :
+            Settings of the training, see `train`. k and near are only part of the name when they change the game.
+        directory : `str`
+            Directory of the cached policies.
+        Returns
+        -------
+        file : `str`
+            Path of the policy, which exists only if it has been trained already.
+        """
+    name = "policy_N{}_rounds{}_alpha{}_gamma{}_epsilon{}_{}_{}".format(N, rounds, alpha, gamma, epsilon, symmetry, keys)
+    if k is not None and k != N:
+        name += "_k{}".format(k)
+    if near is not None:
+        name += "_near{}".format(near)
+    name += ".bin"
+    return os.path.join(directory, name)
+
+
+def train_policy(file, rounds, queue=None, **settings):
+    """Trains two computers and writes the binary policy of player 1 to file, made to run in a background process.
+    The file is written under a temporary name and renamed when complete, so a file at that path is always a whole policy.
+
+        Parameters
+        ----------
+        file : `str`
+            Path of the policy, as given by `policy_path`.
+        rounds : `int`
+            Number of games in the training.
+        queue : `multiprocessing.Queue`
+            If given, receives ("progress", done, rounds) during the training, then ("done", file) or ("error", message).
+        settings :
+            Other arguments of `train`.
+        """
+    try:
+        progress = None if queue is None else lambda done, total: queue.put(("progress", done, total))
+        p1, p2 = train(rounds, progress=progress, **settings)
+        directory = os.path.dirname(file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        p1.save_policy(format="binary", file=file + ".tmp")
+        os.replace(file + ".tmp", file)
+    except Exception as error:
+        if queue is None:
+            raise
+        queue.put(("error", repr(error)))
+    else:
+        if queue is not None:
+            queue.put(("done", file))
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from TicTacToeAI import Computer, zobrist_hashes
+
+
+def boards(N, count=30, seed=0):
+    """Random boards with the number of stones of alternate play, with the symbol to move."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        board = [2] * (N*N)
+        stones = rng.randrange(N*N)
+        for i, p in enumerate(rng.sample(range(N*N), stones)):
+            board[p] = i % 2
+        yield board, stones % 2
+
+
+@pytest.mark.parametrize("keys", ["string", "zobrist"])
+@pytest.mark.parametrize("symmetry", ["all", "canonical"])
+@pytest.mark.parametrize("N", [3, 4, 7])
+def test_afterstate_keys_equal_state_key(N, symmetry, keys):
+    computer = Computer("c", keys=keys, symmetry=symmetry)
+    for board, symbol in boards(N):
+        positions = [p for p, cell in enumerate(board) if cell == 2]
+        expected = []
+        for p in positions:
+            after = board.copy()
+            after[p] = symbol
+            expected.append(computer.state_key(after))
+        assert computer.afterstate_keys(positions, board, symbol) == expected
+        if keys == "zobrist":
+            # as given by an incremental game
+            assert computer.afterstate_keys(positions, board, symbol, hashes=zobrist_hashes(board)) == expected
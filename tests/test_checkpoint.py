@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from TicTacToeAI import train
+
+
+def tables(players):
+    return [dict(player.states_value.items()) for player in players]
+
+
+@pytest.mark.parametrize("settings", [
+    dict(),
+    dict(keys="zobrist", table="array"),
+    dict(keys="zobrist", table="array", max_bytes=1 << 12, evict="lfu"),
+    dict(keys="zobrist", table="array", max_bytes=1 << 12, evict="lru"),
+    dict(keys="zobrist", table="array", max_bytes=1 << 12, evict="near"),
+    dict(keys="zobrist", table="array", batch=16),
+    dict(keys="zobrist", table="array", replay=64),
+    dict(keys="zobrist", table="array", workers=2, sync_every=25),
+    dict(keys="zobrist", table="array", workers=2, sync_every=25, max_bytes=1 << 12, evict="lfu"),
+])
+def test_resume_equals_an_uninterrupted_run(tmp_path, settings):
+    # batches of games and of replayed states are cut at the checkpoints, so the uninterrupted run saves them too
+    expected = tables(train(400, N=3, seed=1, checkpoint=str(tmp_path / "reference"), checkpoint_every=50, **settings))
+    directory = str(tmp_path / "checkpoints")
+    train(230, N=3, seed=1, checkpoint=directory, checkpoint_every=50, **settings)
+    # a crash while writing the checkpoint of round 230: the games after the one of round 200 are played again
+    log = os.path.join(directory, "delta.log")
+    os.truncate(log, os.path.getsize(log) - 10)
+    resumed = tables(train(400, N=3, seed=1, checkpoint=directory, checkpoint_every=50, **settings))
+    assert resumed == expected
+
+
+def test_checkpoints_dont_change_a_sequential_run(tmp_path):
+    expected = tables(train(200, N=3, seed=3))
+    assert tables(train(200, N=3, seed=3, checkpoint=str(tmp_path), checkpoint_every=30)) == expected
+
+
+def test_resume_after_the_last_round(tmp_path):
+    directory = str(tmp_path / "checkpoints")
+    expected = tables(train(100, N=3, seed=2, checkpoint=directory, checkpoint_every=30))
+    assert tables(train(100, N=3, seed=2, checkpoint=directory, checkpoint_every=30)) == expected
+
+
+def test_resume_from_a_compacted_log(tmp_path):
+    settings = dict(keys="zobrist", table="array", max_bytes=1 << 12, evict="lru")
+    expected = tables(train(300, N=3, seed=4, **settings))
+    directory = str(tmp_path / "checkpoints")
+    # 25 checkpoints, folded into base.pkl every 10
+    train(250, N=3, seed=4, checkpoint=directory, checkpoint_every=10, **settings)
+    assert os.path.exists(os.path.join(directory, "base.pkl"))
+    assert tables(train(300, N=3, seed=4, checkpoint=directory, checkpoint_every=10, **settings)) == expected
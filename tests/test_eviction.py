@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from TicTacToeAI import ValueTable, train
+
+
+def test_budget_bounds_the_table():
+    table = ValueTable(max_bytes=4096, evict="lru")
+    keys = np.arange(1, 2001, dtype=np.uint64)
+    for start in range(0, len(keys), 50):
+        table.set_many(keys[start:start + 50], np.ones(50, dtype=np.float32))
+        table.tick()
+        assert len(table) <= table.max_entries
+        assert table.nbytes <= 4096
+    assert table.evicted == 2000 - len(table)
+    # more keys than the budget holds in one call are written in chunks
+    table.set_many(keys, np.ones(2000, dtype=np.float32))
+    assert len(table) <= table.max_entries
+
+
+def test_growing_beyond_the_budget_without_eviction():
+    table = ValueTable(capacity=8, max_bytes=4096)
+    with pytest.raises(MemoryError):
+        table.set_many(np.arange(1, 2001, dtype=np.uint64), np.ones(2000, dtype=np.float32))
+
+
+@pytest.mark.parametrize("evict, kept, evicted", [
+    ("lfu", range(1, 9), range(9, 17)),
+    ("lru", range(9, 17), range(1, 9)),
+    ("near", range(1, 9), range(9, 17)),
+])
+def test_eviction_order(evict, kept, evicted):
+    table = ValueTable(max_bytes=1024, evict=evict, evict_fraction=0)
+    assert table.max_entries == 16
+    for key in range(1, 9):
+        # visited often, with values far from 0, long ago
+        for _ in range(3):
+            table[key] = 1.0
+    table.tick()
+    for key in range(9, 17):
+        table[key] = 0.01
+    table.tick()
+    table.dropped = set()
+    table.set_many(np.arange(17, 25, dtype=np.uint64), np.ones(8, dtype=np.float32))
+    assert table.dropped == set(evicted)
+    assert all(key in table for key in kept)
+    assert all(key in table for key in range(17, 25))
+
+
+def test_current_round_is_evicted_last():
+    table = ValueTable(max_bytes=1024, evict="lfu", evict_fraction=0)
+    for key in range(1, 17):
+        table[key] = 1.0
+    table.tick()
+    for key in range(1, 13):
+        table[key] = 1.0
+    table[17] = 1.0
+    # keys 13 to 16 were updated the least and before this round, only one of them makes room
+    assert len(table) == 16
+    assert all(key in table for key in range(1, 13))
+    assert sum(key in table for key in range(13, 17)) == 3
+
+
+def test_training_under_a_budget():
+    p1, p2 = train(300, N=3, keys="zobrist", table="array", max_bytes=1 << 12, evict="lfu", seed=0)
+    for player in (p1, p2):
+        assert len(player.states_value) <= player.states_value.max_entries
+        assert player.states_value.evicted > 0
@@ -0,0 +1,16 @@
+import pytest
+
+from TicTacToeAI import Computer, ParallelTrainer
+
+
+def test_merge_is_visit_weighted():
+    p1, p2 = Computer("p1", keys="zobrist"), Computer("p2", keys="zobrist")
+    p1.states_value[7] = 0.5
+    trainer = ParallelTrainer(p1, p2, 3, workers=2)
+    merged = trainer.merge(p1, [{1: (1.0, 1), 2: (0.2, 2)}, {1: (0.0, 3)}])
+    assert merged == pytest.approx({1: 0.25, 2: 0.2})
+    assert p1.states_value[1] == pytest.approx(0.25)
+    assert p1.states_value[2] == pytest.approx(0.2)
+    # keys no worker updated keep their value
+    assert p1.states_value[7] == 0.5
+
@@ -0,0 +1,29 @@
+import pytest
+
+from TicTacToeAI import Computer, PolicyFile, train, write_policy
+
+
+@pytest.mark.parametrize("keys", ["string", "zobrist"])
+def test_binary_policy_round_trip(tmp_path, keys):
+    p1, _ = train(200, N=3, keys=keys, seed=0)
+    file = str(tmp_path / "policy.bin")
+    p1.save_policy(format="binary", file=file)
+    policy = PolicyFile(file)
+    try:
+        assert policy.N == 3
+        assert len(policy) == len(p1.states_value)
+        for key, value in p1.states_value.items():
+            assert policy[key] == pytest.approx(value)
+    finally:
+        policy.close()
+    computer = Computer("c", keys=keys)
+    computer.load_policy(file, mmap=False)
+    assert computer.size == 9
+    assert dict(computer.states_value.items()) == pytest.approx(dict(p1.states_value.items()))
+
+
+def test_binary_policy_needs_N(tmp_path):
+    p1, _ = train(10, N=3, seed=0)
+    for N in (None, 0):
+        with pytest.raises(ValueError):
+            write_policy(str(tmp_path / "policy.bin"), p1.states_value, N, p1.alpha, p1.gamma)
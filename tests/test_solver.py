@@ -0,0 +1,83 @@
+import functools
+
+import pytest
+
+from TicTacToeAI import Solver
+
+
+def all_lines(N):
+    rows = [[N*i + j for j in range(N)] for i in range(N)]
+    columns = [[N*j + i for j in range(N)] for i in range(N)]
+    return rows + columns + [[N*i + i for i in range(N)], [N*i + N - 1 - i for i in range(N)]]
+
+
+def winner(board, lines):
+    for line in lines:
+        if board[line[0]] != 2 and all(board[p] == board[line[0]] for p in line):
+            return board[line[0]]
+    return None
+
+
+def reference(N):
+    """Plain negamax over every board, scored like the solver."""
+    lines = all_lines(N)
+
+    @functools.lru_cache(maxsize=None)
+    def score(board, symbol):
+        empty = [p for p, cell in enumerate(board) if cell == 2]
+        best = None
+        for p in empty:
+            after = board[:p] + (symbol,) + board[p + 1:]
+            if winner(after, lines) is not None:
+                value = N*N + 1 - (N*N - len(empty) + 1)
+            elif len(empty) == 1:
+                value = 0
+            else:
+                value = -score(after, 1 - symbol)
+            best = value if best is None else max(best, value)
+        return best
+
+    return score
+
+
+def reachable(N):
+    """Every board with moves left reached by alternate play from the empty board, with the player to move."""
+    lines = all_lines(N)
+    boards, stack = {}, [((2,) * (N*N), 0)]
+    while stack:
+        board, symbol = stack.pop()
+        if board in boards or winner(board, lines) is not None or 2 not in board:
+            continue
+        boards[board] = symbol
+        for p, cell in enumerate(board):
+            if cell == 2:
+                stack.append((board[:p] + (symbol,) + board[p + 1:], 1 - symbol))
+    return boards
+
+
+@pytest.mark.parametrize("N", [2, 3])
+def test_scores_match_a_plain_negamax(N):
+    solver, score = Solver("s"), reference(N)
+    for board, symbol in reachable(N).items():
+        assert solver.solve(list(board), symbol) == score(board, symbol)
+
+
+def test_known_scores():
+    solver = Solver("s")
+    assert solver.solve([2] * 9, 0) == 0
+    assert solver.solve([2] * 4, 0) == 2
+    # X wins at once by completing the top row
+    assert solver.solve([0, 0, 2, 1, 1, 2, 2, 2, 2], 0) == 5
+    assert solver.choose_action([2, 5, 6, 7, 8], [0, 0, 2, 1, 1, 2, 2, 2, 2], 0) == 2
+    # O must block the top row
+    assert solver.choose_action([2, 5, 6, 7, 8], [0, 0, 2, 1, 2, 2, 0, 2, 2], 1) == 2
+
+
+def test_cache_round_trip(tmp_path):
+    cache = str(tmp_path / "solver.npz")
+    solver = Solver("s", cache=cache)
+    solver.solve([2] * 9, 0)
+    solver.save_cache()
+    loaded = Solver("t", cache=cache)
+    assert loaded.tables.keys() == solver.tables.keys()
+    assert loaded.solve([2] * 9, 0) == 0
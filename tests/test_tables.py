@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from TicTacToeAI import ValueTable
+
+
+def random_keys(count, seed=0):
+    # 0 marks the empty slots, keys start at 1
+    return np.random.default_rng(seed).integers(1, 1 << 63, size=count, dtype=np.uint64)
+
+
+def test_get_many_set_many_match_a_dictionary():
+    table = ValueTable(capacity=8)
+    keys = random_keys(5000)
+    values = np.random.default_rng(1).random(5000).astype(np.float32)
+    table.set_many(keys, values)
+    assert len(table) == 5000
+    assert table.load_factor <= table.max_load
+    np.testing.assert_array_equal(table.get_many(keys), values)
+    for key, value in zip(keys.tolist()[:100], values.tolist()[:100]):
+        assert table[key] == pytest.approx(value)
+    missing = random_keys(100, seed=2)
+    np.testing.assert_array_equal(table.get_many(missing, default=-1.0), np.full(100, -1.0, dtype=np.float32))
+
+
+def test_set_many_keeps_the_last_value_of_a_repeated_key():
+    table = ValueTable()
+    keys = np.array([5, 7, 5, 9, 5] * 10, dtype=np.uint64)
+    values = np.arange(50, dtype=np.float32)
+    table.set_many(keys, values)
+    assert len(table) == 3
+    assert table[5] == 49 and table[7] == 46 and table[9] == 48
+    table.set_many(keys[:2], np.array([-1, -2], dtype=np.float32))
+    assert table[5] == -1 and table[7] == -2
+    assert len(table) == 3
+
+
+def test_copy_and_update():
+    table = ValueTable()
+    table.set_many(random_keys(300), np.ones(300, dtype=np.float32))
+    copy = table.copy()
+    copy[1] = 2.0
+    assert 1 not in table
+    table.update(copy)
+    assert dict(table.items()) == dict(copy.items())